@@ -0,0 +1,85 @@
+"""
+Packs every animated sprite (<name>.png, <name>_2.png, <name>_3.png, <name>_4.png) from asserts/graphics into one
+atlas image plus a json index, run from the project directory:\n
+python -m asserts.graphics.atlas_builder
+"""
+import argparse
+import json
+import os
+from typing import Dict, List, Tuple
+
+import pygame as p
+
+GRAPHICS_DIR = os.path.join(os.path.abspath(""), "asserts", "graphics")
+ATLAS_IMAGE = "atlas.png"
+ATLAS_INDEX = "atlas.json"
+FRAME_SUFFIXES = ("", "_2", "_3", "_4")
+
+rectT = Tuple[int, int, int, int]
+
+
+def find_sprites(directory: str) -> List[str]:
+    files = set(os.listdir(directory))
+    ret = []
+    for file in sorted(files):
+        if not file.endswith(".png") or file == ATLAS_IMAGE:
+            continue
+        name = file[:-4]
+        if all(name + suffix + ".png" in files for suffix in FRAME_SUFFIXES):
+            ret.append(name)
+    return ret
+
+
+def sprite_files(directory: str, name: str) -> List[str]:
+    return [os.path.join(directory, name + suffix + ".png") for suffix in FRAME_SUFFIXES]
+
+
+def is_outdated(directory: str, names: List[str]) -> bool:
+    image = os.path.join(directory, ATLAS_IMAGE)
+    index = os.path.join(directory, ATLAS_INDEX)
+    if not (os.path.exists(image) and os.path.exists(index)):
+        return True
+    built = min(os.path.getmtime(image), os.path.getmtime(index))
+    return any(os.path.getmtime(f) > built for name in names for f in sprite_files(directory, name))
+
+
+def build(directory: str = GRAPHICS_DIR) -> Dict[str, List[rectT]]:
+    """
+    Packs one sprite per row, frames from left to right.
+    :return: index of frame rects by sprite name
+    """
+    names = find_sprites(directory)
+    loaded = {name: [p.image.load(f) for f in sprite_files(directory, name)] for name in names}
+    width = max(sum(s.get_width() for s in frames) for frames in loaded.values())
+    height = sum(max(s.get_height() for s in frames) for frames in loaded.values())
+    atlas = p.Surface((width, height), p.SRCALPHA)
+    index: Dict[str, List[rectT]] = {}
+    y = 0
+    for name in names:
+        x = 0
+        index[name] = []
+        for surface in loaded[name]:
+            atlas.blit(surface, (x, y))
+            index[name].append((x, y, surface.get_width(), surface.get_height()))
+            x += surface.get_width()
+        y += max(s.get_height() for s in loaded[name])
+    p.image.save(atlas, os.path.join(directory, ATLAS_IMAGE))
+    with open(os.path.join(directory, ATLAS_INDEX), "w") as file:
+        json.dump({"image": ATLAS_IMAGE, "sprites": index}, file, sort_keys=True)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="build sprite atlas")
+    parser.add_argument("-d", "--directory", default=GRAPHICS_DIR, help="graphics directory")
+    parser.add_argument("-f", "--force", action="store_true", help="rebuild even if atlas is up to date")
+    args = parser.parse_args()
+    if args.force or is_outdated(args.directory, find_sprites(args.directory)):
+        index = build(args.directory)
+        print(f"packed {len(index)} sprites into {os.path.join(args.directory, ATLAS_IMAGE)}")
+    else:
+        print("atlas is up to date")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Optional, Tuple, Union
+
+import pygame as p
+
+import asserts.sourse.settings as settings
+
+COLOR = Union[p.Color, Tuple[int, int, int], Tuple[int, int, int, int]]
+textKeyT = Tuple[str, p.font.Font, Tuple[int, ...], bool, Optional[Tuple[int, ...]]]
+
+
+@lru_cache(maxsize=None)
+def get_font(name: Optional[str], size: int, bold: bool = False, italic: bool = False,
+             system: bool = True) -> p.font.Font:
+    """
+    Resolves a font once, SysFont scans the system font list on every call.\n
+    :param system: name is a system font name, else a font file path (None for the pygame default font)
+    """
+    if system:
+        return p.font.SysFont(name, size, bold, italic)
+    font = p.font.Font(name, size)
+    font.set_bold(bold)
+    font.set_italic(italic)
+    return font
+
+
+def clear_fonts():
+    """
+    Fonts are invalid after p.font.quit, call it before initializing the font module again.
+    """
+    get_font.cache_clear()
+    text_cache.clear()
+
+
+class TextCache:
+    """
+    Rendered text surfaces by (text, font, color, antialias, background), least recently used ones are evicted past
+    max_entries.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._surfaces: "OrderedDict[textKeyT, p.Surface]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._surfaces)
+
+    def render(self, text: str, font: p.font.Font, color: COLOR, antialias: bool = True,
+               background: Optional[COLOR] = None) -> p.Surface:
+        """
+        The returned surface is shared, blit it instead of drawing on it.
+        """
+        key = (text, font, tuple(p.Color(color)), antialias, None if background is None else tuple(p.Color(background)))
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self._surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = self._surfaces[key] = font.render(text, antialias, color, background)
+        while len(self._surfaces) > self.max_entries:
+            self._surfaces.popitem(last=False)
+            self.evictions += 1
+        return surface
+
+    def clear(self):
+        self._surfaces.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "entries": len(self),
+                "max_entries": self.max_entries}
+
+
+text_cache = TextCache(settings.TEXT_CACHE_MAX_ENTRIES)
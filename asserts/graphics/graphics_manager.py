@@ -1,10 +1,14 @@
+import json
 import os
+from collections import OrderedDict
 from enum import Enum
 from functools import lru_cache
-from typing import List, Tuple, Union, Optional, Dict
+from typing import List, Tuple, Union, Optional, Dict, Callable
 
 import pygame as p
 
+import asserts.sourse.settings as settings
+
 SPRITES = (
     "bg", "spikes_floor", "spikes_left", "spikes_right", "spikes_ceiling", "spikes_floating", "wall_bottom",
     "wall_bottom_left", "wall_bottom_right", "wall_center", "wall_flat_top", "wall_flat_top_left_corner",
@@ -58,13 +62,14 @@ WIN = "win"
 
 class AnimatedSprite(p.sprite.Sprite):
     def __init__(self, frames: Union[List[p.Surface], Tuple[p.Surface]], max_ticks: int, x: float = 0, y: float = 0,
-                 hit_box: Optional[p.Rect] = None, steps: int = 1, *groups: p.sprite.AbstractGroup):
+                 hit_box: Optional[p.Rect] = None, steps: int = 1, *groups: p.sprite.AbstractGroup,
+                 convert: bool = True):
         super().__init__(*groups)
         self._real_x = x
         self._real_y = y
         self.offset_x = 0
         self.offset_y = 0
-        self.frames = [s.convert_alpha() for s in frames]
+        self.frames = [s.convert_alpha() for s in frames] if convert and p.display.get_surface() else frames
         self.frame = 0
         self.steps = steps
         self.update_image()
@@ -83,17 +88,17 @@ class AnimatedSprite(p.sprite.Sprite):
 
     @property
     def y(self):
-        return self._real_y + self.offset_x
+        return self._real_y + self.offset_y
 
     @y.setter
     def y(self, value: int):
-        self._real_x = value
+        self._real_y = value
 
     @property
     def hit_box(self) -> p.Rect:
         h = self.hit_box_default.copy()
         h.x += self.x
-        h.y += self.x
+        h.y += self.y
         return h
 
     def set_offset(self, x: float, y: float):
@@ -151,38 +156,201 @@ def load_image(name: str):
     return p.image.load(os.path.abspath("") + "/asserts/graphics/" + name)
 
 
+def convert(surface: p.Surface) -> p.Surface:
+    # converting needs a display, headless apps use surfaces as loaded
+    if p.display.get_surface() is None:
+        return surface
+    return surface.convert_alpha()
+
+
+# frames of every animated sprite, see frame_files
+FRAME_COUNT = 4
+
+
+def frame_files(name: str) -> Tuple[str, str, str, str]:
+    return name + ".png", name + "_2.png", name + "_3.png", name + "_4.png"
+
+
+def surface_bytes(surface: p.Surface) -> int:
+    # subsurfaces share the pixels of their parent
+    if surface.get_parent() is not None:
+        return 0
+    return surface.get_bytesize() * surface.get_width() * surface.get_height()
+
+
+class Atlas:
+    """
+    Sprite sheet built by atlas_builder, frames are handed out as subsurfaces of the one decoded image.
+    """
+
+    def __init__(self, image: p.Surface, index: Dict[str, List[Tuple[int, int, int, int]]]):
+        self.image = image
+        self.index = index
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def frames(self, name: str) -> Tuple[p.Surface, ...]:
+        return tuple(self.image.subsurface(r) for r in self.index[name])
+
+    @classmethod
+    def load(cls, index_name: str = "atlas.json") -> Optional["Atlas"]:
+        path = os.path.abspath("") + "/asserts/graphics/" + index_name
+        if not os.path.exists(path):
+            return None
+        with open(path) as file:
+            data = json.load(file)
+        return cls(convert(load_image(data["image"])), data["sprites"])
+
+
+class SurfaceCache:
+    """
+    Process-wide cache of decoded and converted animation frames.\n
+    Every sprite of the same name shares one frames tuple, least recently used names are evicted when the cache holds
+    more than max_bytes of pixel data. Not locked, surfaces are only made on the main thread.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._frames: "OrderedDict[str, Tuple[p.Surface, ...]]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._atlas: Optional[Atlas] = None
+        self._atlas_loaded = False
+
+    @property
+    def atlas(self) -> Optional[Atlas]:
+        if not self._atlas_loaded:
+            self._atlas_loaded = True
+            self._atlas = Atlas.load() if settings.USE_SPRITE_ATLAS else None
+        return self._atlas
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._frames
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def get(self, name: str) -> Tuple[p.Surface, ...]:
+        frames = self._frames.get(name)
+        if frames is not None:
+            self.hits += 1
+            self._frames.move_to_end(name)
+            return frames
+        self.misses += 1
+        atlas = self.atlas
+        if atlas is not None and name in atlas:
+            frames = atlas.frames(name)
+        else:
+            frames = tuple(convert(load_image(f)) for f in frame_files(name))
+        self.put(name, frames)
+        return frames
+
+    def put(self, name: str, frames: Tuple[p.Surface, ...]):
+        if name in self._frames:
+            self.bytes -= self._sizes.pop(name)
+            del self._frames[name]
+        size = sum(map(surface_bytes, frames))
+        self._frames[name] = frames
+        self._sizes[name] = size
+        self.bytes += size
+        self.shrink()
+
+    def shrink(self):
+        # the newest entry always stays, even if it alone is over the limit
+        while self.bytes > self.max_bytes and len(self._frames) > 1:
+            name, _ = self._frames.popitem(last=False)
+            self.bytes -= self._sizes.pop(name)
+            self.evictions += 1
+
+    def clear(self):
+        self._frames.clear()
+        self._sizes.clear()
+        self.bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        atlas_bytes = surface_bytes(self._atlas.image) if self._atlas is not None else 0
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "bytes": self.bytes,
+                "atlas_bytes": atlas_bytes, "entries": len(self._frames), "max_bytes": self.max_bytes}
+
+
+surface_cache = SurfaceCache(settings.SURFACE_CACHE_MAX_BYTES)
+
+
+def load_frames(name: str) -> Tuple[p.Surface, ...]:
+    return surface_cache.get(name)
+
+
 def get_sprite(name: str, ticks: int, x: float = 0, y: float = 0,
                hit_box: Union[Tuple[int, int, int, int], p.Rect, None] = None,
                steps: int = 0) -> AnimatedSprite:
-    f = name + ".png"
-    s = name + "_2.png"
-    fd = name + "_3.png"
-    ft = name + "_4.png"
-    return AnimatedSprite([load_image(f), load_image(s), load_image(fd), load_image(ft)], ticks, x,
-                          y, p.Rect(hit_box) if hit_box else None, steps)
+    return AnimatedSprite(load_frames(name), ticks, x, y, p.Rect(hit_box) if hit_box else None, steps,
+                          convert=False)
 
 
 def get_chained_sprite(name: str, ticks: int, animation_loops, x: float = 0, y: float = 0,
                        hit_box: Union[Tuple[int, int, int, int], p.Rect, None] = None,
                        steps: int = 0) -> "ChainedAnimatedSprite":
-    f = name + ".png"
-    s = name + "_2.png"
-    fd = name + "_3.png"
-    ft = name + "_4.png"
-    return ChainedAnimatedSprite([load_image(f), load_image(s), load_image(fd), load_image(ft)], ticks,
-                                 animation_loops, x, y, p.Rect(hit_box) if hit_box else None, steps)
+    return ChainedAnimatedSprite(load_frames(name), ticks, animation_loops, x, y,
+                                 p.Rect(hit_box) if hit_box else None, steps, convert=False)
 
 
-# noinspection PyUnusedLocal
 def get_player_sprite(ticks: int, x: float, y: float) -> "MultipleStateAnimatedSprite":
-    p_i = get_sprite("player_idle", ticks, x, y)
-    p_f = get_sprite("player_fly", ticks, x, y)
-    p_j_a = get_sprite("player_jump_abort", ticks, x, y)
-    p_j_a_r = get_chained_sprite("player_jump_abort", ticks, x, y, steps=-1)
-    p_c_s = get_sprite("player_ceiling_stick", ticks, x, y)
-    p_s_j = get_sprite("player_start_jump", ticks, x, y)
+    """
+    Only the idle state is built now, the others when the player first switches to them.
+    """
+    return MultipleStateAnimatedSprite({"idle": (lambda: get_sprite("player_idle", ticks, x, y), "idle"),
+                                        "fly": (lambda: get_sprite("player_fly", ticks, x, y), "fly")}, "idle")
+
+
+class TileType:
+    """
+    Flyweight shared by every map cell of one tile id, cells themselves are only ids in the level grid.\n
+    Frames are not kept, they are looked up in surface_cache on use so its bound and clear() apply to them too.
+    """
+
+    def __init__(self, tile_id: int):
+        self.id = tile_id
+        self.name = SPRITES[tile_id]
+
+    @property
+    def frames(self) -> Tuple[p.Surface, ...]:
+        return load_frames(self.name)
+
+    def frame(self, frame: int) -> p.Surface:
+        frames = self.frames
+        return frames[frame % len(frames)]
 
-    return MultipleStateAnimatedSprite({"idle": (p_i, "idle"), "fly": (p_f, "fly")}, "idle")
+
+@lru_cache(maxsize=len(SPRITES))
+def get_tile_type(tile_id: int) -> TileType:
+    return TileType(tile_id)
+
+
+class AnimationClock:
+    """
+    One clock for all tiles, tiles of a type animate in lockstep so the clock picks the frame for every one of them.\n
+    The frame wraps at frames, so it can key caches of rendered frames.
+    """
+
+    def __init__(self, max_ticks: int, steps: int = 1, frames: int = FRAME_COUNT):
+        self.max_ticks = max_ticks
+        self.steps = steps
+        self.frames = frames
+        self.ticks = 0
+
+    def tick(self):
+        self.ticks += 1
+
+    def reset(self):
+        self.ticks = 0
+
+    @property
+    def frame(self) -> int:
+        return self.ticks // self.max_ticks * self.steps % self.frames
 
 
 class Sprites(Enum):
@@ -195,12 +363,7 @@ class Sprites(Enum):
     def _get_sprite(item: str, max_ticks: int, x: float, y: float, hit_box: Optional[Tuple[int, int, int, int]] = None) \
             -> "AnimatedSprite":
         if item in SPRITES:
-            f = item + ".png"
-            s = item + "_2.png"
-            fd = item + "_3.png"
-            ft = item + "_4.png"
-            return AnimatedSprite([load_image(f), load_image(s), load_image(fd), load_image(ft)], max_ticks, x,
-                                  y, hit_box)
+            return AnimatedSprite(load_frames(item), max_ticks, x, y, hit_box, convert=False)
         else:
             raise AttributeError
 
@@ -231,8 +394,8 @@ class ChainedAnimatedSprite(AnimatedSprite):
     def __init__(self, frames: Union[List[p.Surface], Tuple[p.Surface]], max_ticks: int,
                  max_animation_loops: int = 1, x: float = 0, y: float = 0, hit_box: Optional[p.Rect] = None,
                  steps: int = 1,
-                 *groups: p.sprite.AbstractGroup):
-        super().__init__(frames, max_ticks, x, y, hit_box, steps, *groups)
+                 *groups: p.sprite.AbstractGroup, convert: bool = True):
+        super().__init__(frames, max_ticks, x, y, hit_box, steps, *groups, convert=convert)
         self.max_animation_loops = max_animation_loops
 
     def next_state(self) -> bool:
@@ -242,10 +405,20 @@ class ChainedAnimatedSprite(AnimatedSprite):
 
 
 class MultipleStateAnimatedSprite(p.sprite.Sprite):
-    def __init__(self, states: Dict[str, Tuple[AnimatedSprite, str]], current_state: str):
+    def __init__(self, states: Dict[str, Tuple[Union[AnimatedSprite, Callable[[], AnimatedSprite]], str]],
+                 current_state: str):
+        """
+        :param states: name: (sprite or function building it on first use, name of the state after it)
+        """
         super().__init__()
         self.states = states
-        self._state = self.states[current_state]
+        self._state = self._get_state(current_state)
+
+    def _get_state(self, name: str) -> Tuple[AnimatedSprite, str]:
+        sprite, next_state = self.states[name]
+        if not isinstance(sprite, p.sprite.Sprite):
+            self.states[name] = sprite, next_state = sprite(), next_state
+        return sprite, next_state
 
     @property
     def state(self):
@@ -289,7 +462,7 @@ class MultipleStateAnimatedSprite(p.sprite.Sprite):
 
     @state.setter
     def state(self, state: str):
-        self._state = self.states[state]
+        self._state = self._get_state(state)
 
     def move(self, x: float, y: float):
         self.state.move(x, y)
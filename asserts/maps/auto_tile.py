@@ -0,0 +1,133 @@
+"""
+Derives tile ids from a plain grid of tile classes (collisions.EMPTY, WALL, SPIKE, WIN), map x is the row.
+
+A wall's variant follows from which of its north, east, south and west neighbours are walls too, a spike's from the
+wall it stands on or hangs from. Outside the map counts as wall above and below and as empty to the sides, so the
+bottom row is a flat floor with open corners like the hand made levels.
+"""
+from typing import List, Sequence, Tuple
+
+from asserts.graphics.graphics_manager import SPRITES
+from asserts.sourse.collisions import EMPTY, WALL, SPIKE, WIN
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+N = 1
+E = 2
+S = 4
+W = 8
+
+# north, east, south, west
+OUTSIDE = (True, False, True, False)
+
+# neighbour mask: sprite
+WALL_VARIANTS = {
+    0: "wall_floating",
+    N: "wall_left_n_right",
+    E: "wall_floating_left",
+    N | E: "wall_bottom_left",
+    S: "wall_top",
+    N | S: "wall_left_n_right",
+    E | S: "wall_flat_top_left_corner",
+    N | E | S: "wall_open_left",
+    W: "wall_floating_right",
+    N | W: "wall_bottom_right",
+    E | W: "wall_floating_both",
+    N | E | W: "wall_bottom",
+    S | W: "wall_flat_top_right_corner",
+    N | S | W: "wall_open_right",
+    E | S | W: "wall_flat_top",
+    N | E | S | W: "wall_center",
+}
+
+
+def _spike_variant(mask: int) -> str:
+    if mask & S:
+        return "spikes_floor"
+    if mask & N:
+        return "spikes_ceiling"
+    return "spikes_floating"
+
+
+# tile class (0 to WIN), neighbour mask: tile id
+TILE_TABLE = tuple(
+    tuple(SPRITES.index(WALL_VARIANTS[m]) if c == WALL else SPRITES.index(_spike_variant(m)) if c == SPIKE else
+          SPRITES.index("win") if c == WIN else SPRITES.index("bg") for m in range(16))
+    for c in range(WIN + 1)
+)
+
+classesT = Sequence[Sequence[int]]
+
+
+def auto_tile(classes: classesT, outside: Tuple[bool, bool, bool, bool] = OUTSIDE) -> List[List[int]]:
+    """
+    Tile ids of the whole grid, one vectorized pass if numpy is installed.
+    """
+    if np is not None:
+        return auto_tile_array(np.asarray(classes, dtype=np.uint8), outside).tolist()
+    width = len(classes)
+    height = max(map(len, classes), default=0)
+    return [[tile_at(classes, x, y, width, height, outside) for y in range(len(row))] for x, row in enumerate(classes)]
+
+
+def auto_tile_array(classes: "np.ndarray", outside: Tuple[bool, bool, bool, bool] = OUTSIDE) -> "np.ndarray":
+    """
+    :param classes: (rows, columns) uint8 tile classes
+    :return: (rows, columns) uint8 tile ids
+    """
+    solid = np.pad((classes & WALL) != 0, 1)
+    north, east, south, west = outside
+    solid[0, :] = north
+    solid[-1, :] = south
+    solid[:, 0] = west
+    solid[:, -1] = east
+    mask = solid[:-2, 1:-1] * np.uint8(N)
+    mask |= solid[1:-1, 2:] * np.uint8(E)
+    mask |= solid[2:, 1:-1] * np.uint8(S)
+    mask |= solid[1:-1, :-2] * np.uint8(W)
+    return np.array(TILE_TABLE, dtype=np.uint8)[classes, mask]
+
+
+def tile_at(classes: classesT, x: int, y: int, width: int, height: int,
+            outside: Tuple[bool, bool, bool, bool] = OUTSIDE) -> int:
+    def solid(i: int, j: int, edge: bool) -> bool:
+        if 0 <= i < width and 0 <= j < len(classes[i]):
+            return bool(classes[i][j] & WALL)
+        return edge
+
+    north, east, south, west = outside
+    mask = (solid(x - 1, y, north) * N | solid(x, y + 1, east) * E | solid(x + 1, y, south) * S |
+            solid(x, y - 1, west) * W)
+    return TILE_TABLE[classes[x][y]][mask]
+
+
+class AutoTiler:
+    """
+    Keeps a class grid and its tile ids, changing a cell only reclassifies it and its four neighbours.
+    """
+
+    def __init__(self, classes: classesT, outside: Tuple[bool, bool, bool, bool] = OUTSIDE):
+        self.classes = [list(row) for row in classes]
+        self.width = len(self.classes)
+        self.height = max(map(len, self.classes), default=0)
+        self.outside = outside
+        self.tiles = auto_tile(self.classes, outside)
+
+    def set(self, x: int, y: int, tile_class: int) -> List[Tuple[int, int]]:
+        """
+        :return: cells whose tile id changed
+        """
+        if tile_class not in (EMPTY, WALL, SPIKE, WIN):
+            raise ValueError(f"unknown tile class {tile_class}")
+        self.classes[x][y] = tile_class
+        changed = []
+        for i, j in ((x, y), (x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+            if 0 <= i < self.width and 0 <= j < len(self.classes[i]):
+                tile = tile_at(self.classes, i, j, self.width, self.height, self.outside)
+                if tile != self.tiles[i][j]:
+                    self.tiles[i][j] = tile
+                    changed.append((i, j))
+        return changed
@@ -0,0 +1,186 @@
+"""
+Compiled level format, run from the project directory to convert every changed asserts/maps/*.csv:\n
+python -m asserts.maps.level_compiler
+
+Layout (little endian)::
+
+    header      magic b"LVL1", version, flags, width, height, spawn x, spawn y, win x, win y, hit box count
+    tiles       width * height uint8 tile ids, row after row (map x is the row)
+    masks       width * height uint8 tile class masks (collisions.WALL | SPIKE | WIN)
+    hit boxes   hit box count * (x, y, w, h, mask) int16, every non empty tile
+"""
+import argparse
+import mmap
+import os
+import struct
+import tempfile
+from glob import glob
+from typing import List, Tuple, Sequence, Union
+
+from pygame.math import Vector2
+
+from asserts.maps.auto_tile import auto_tile, auto_tile_array, np
+import asserts.sourse.settings as settings
+from asserts.sourse.collisions import TILE_CLASSES, TILE_SIZE
+from asserts.sourse.csv_reader import CsvOpen
+
+MAGIC = b"LVL1"
+VERSION = 2
+HEADER = struct.Struct("<4sHHHHhhhhI")
+HIT_BOX = struct.Struct("<hhhhh")
+EXTENSION = ".lvl"
+# header flags
+AUTO_TILED = 1
+# hit box coordinates are int16
+MAX_TILES = 0x7fff // TILE_SIZE + 1
+
+mapT = List[List[Union[int, float]]]
+
+
+class CompiledLevel:
+    def __init__(self, buffer: Union[bytes, mmap.mmap]):
+        self.buffer = buffer
+        magic, version, flags, self.width, self.height, sx, sy, wx, wy, self.hit_box_count = HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"not a compiled level (version {VERSION})")
+        self.auto_tiled = bool(flags & AUTO_TILED)
+        self.spawn = Vector2(sx, sy)
+        self.win = Vector2(wx, wy)
+        view = memoryview(buffer)
+        size = self.width * self.height
+        self.tiles = view[HEADER.size:HEADER.size + size]
+        self.masks = view[HEADER.size + size:HEADER.size + 2 * size]
+        start = HEADER.size + 2 * size
+        self.hit_box_data = view[start:start + self.hit_box_count * HIT_BOX.size]
+
+    @property
+    def map(self) -> mapT:
+        h = self.height
+        return [list(self.tiles[x * h:(x + 1) * h]) for x in range(self.width)]
+
+    def hit_boxes(self) -> Tuple[List[Tuple[int, int, int, int]], List[int]]:
+        boxes = []
+        masks = []
+        for x, y, w, h, mask in HIT_BOX.iter_unpack(self.hit_box_data):
+            boxes.append((x, y, w, h))
+            masks.append(mask)
+        return boxes, masks
+
+    def close(self):
+        for view in (self.tiles, self.masks, self.hit_box_data):
+            view.release()
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+
+
+def _check_size(width: int, height: int):
+    if width > MAX_TILES or height > MAX_TILES:
+        raise ValueError(f"{width}x{height} map, hit boxes only fit up to {MAX_TILES}x{MAX_TILES}")
+
+
+def compile_map(spawn: Sequence[int], win: Sequence[int], map_: mapT, flags: int = 0) -> bytes:
+    width = len(map_)
+    height = max(map(len, map_), default=0)
+    _check_size(width, height)
+    tiles = bytearray(width * height)
+    for x, row in enumerate(map_):
+        tiles[x * height:x * height + len(row)] = bytes(int(e) for e in row)
+    masks = tiles.translate(TILE_CLASSES.ljust(256, b"\0"))
+    hit_boxes = [HIT_BOX.pack(i // height * TILE_SIZE, i % height * TILE_SIZE, TILE_SIZE, TILE_SIZE, m)
+                 for i, m in enumerate(masks) if m]
+    header = HEADER.pack(MAGIC, VERSION, flags, width, height, int(spawn[0]), int(spawn[1]), int(win[0]),
+                         int(win[1]), len(hit_boxes))
+    return b"".join((header, bytes(tiles), bytes(masks), *hit_boxes))
+
+
+def compile_grid(spawn: Sequence[int], win: Sequence[int], classes: Sequence[Sequence[int]]) -> bytes:
+    """
+    Compiles a plain grid of tile classes (EMPTY, WALL, SPIKE, WIN), wall and spike variants are picked by auto_tile.
+    """
+    if np is None:
+        return compile_map(spawn, win, auto_tile(classes), AUTO_TILED)
+    tiles = auto_tile_array(np.asarray(classes, dtype=np.uint8))
+    width, height = tiles.shape
+    _check_size(width, height)
+    masks = np.frombuffer(TILE_CLASSES, dtype=np.uint8)[tiles]
+    cells = np.flatnonzero(masks)
+    hit_boxes = np.empty((len(cells), 5), dtype="<i2")
+    rows, columns = np.divmod(cells, height)
+    hit_boxes[:, 0] = rows * TILE_SIZE
+    hit_boxes[:, 1] = columns * TILE_SIZE
+    hit_boxes[:, 2:4] = TILE_SIZE
+    hit_boxes[:, 4] = masks.ravel()[cells]
+    header = HEADER.pack(MAGIC, VERSION, AUTO_TILED, width, height, int(spawn[0]), int(spawn[1]), int(win[0]),
+                         int(win[1]), len(cells))
+    return b"".join((header, tiles.tobytes(), masks.tobytes(), hit_boxes.tobytes()))
+
+
+def compile_csv(csv_path: str, auto_tiled: bool = False) -> bytes:
+    """
+    :param auto_tiled: ignore the wall and spike variants in the csv and derive them with auto_tile
+    """
+    with CsvOpen(csv_path, "r") as file:
+        rows = [[int(e) for e in row] for row in file]
+    if auto_tiled:
+        return compile_grid(rows[0][0:2], rows[0][2:4], [[TILE_CLASSES[e] for e in row] for row in rows[1:]])
+    return compile_map(rows[0][0:2], rows[0][2:4], rows[1:])
+
+
+def compiled_path(csv_path: str) -> str:
+    return os.path.splitext(csv_path)[0] + EXTENSION
+
+
+def is_outdated(csv_path: str, auto_tiled: bool = False) -> bool:
+    """
+    The compiled level is missing, older than the csv, of another version or (not) auto tiled unlike asked.
+    """
+    target = compiled_path(csv_path)
+    if not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(csv_path):
+        return True
+    with open(target, "rb") as file:
+        header = file.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return True
+    magic, version, flags = HEADER.unpack(header)[:3]
+    return magic != MAGIC or version != VERSION or bool(flags & AUTO_TILED) != auto_tiled
+
+
+def write(csv_path: str, auto_tiled: bool = False) -> str:
+    target = compiled_path(csv_path)
+    data = compile_csv(csv_path, auto_tiled)
+    # levels are compiled on the prefetch thread and the main thread, each writer gets its own temporary file
+    fd, tmp = tempfile.mkstemp(".tmp", os.path.basename(target) + ".", os.path.dirname(target) or ".")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.replace(tmp, target)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    return target
+
+
+def load(path: str) -> CompiledLevel:
+    with open(path, "rb") as file:
+        return CompiledLevel(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="compile csv levels")
+    parser.add_argument("files", nargs="*", help="csv files, all of asserts/maps by default")
+    parser.add_argument("-f", "--force", action="store_true", help="recompile up to date levels too")
+    parser.add_argument("-a", "--auto-tile", action="store_true", default=settings.AUTO_TILE_LEVELS,
+                        help="derive wall and spike variants from the neighbouring tiles instead of the csv ids "
+                             "(default: settings.AUTO_TILE_LEVELS)")
+    parser.add_argument("--no-auto-tile", action="store_false", dest="auto_tile", help="use the csv tile ids")
+    args = parser.parse_args()
+    files = args.files or sorted(glob(os.path.join("asserts", "maps", "*.csv")))
+    for csv_path in files:
+        if args.force or is_outdated(csv_path, args.auto_tile):
+            print(f"{csv_path} -> {write(csv_path, args.auto_tile)}")
+        else:
+            print(f"{csv_path} is up to date")
+
+
+if __name__ == '__main__':
+    main()
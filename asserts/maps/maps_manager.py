@@ -1,7 +1,11 @@
+import struct
 from typing import List, Tuple, Optional, Union
 
 from pygame.math import Vector2
 
+from asserts.maps import level_compiler
+from asserts.maps.level_compiler import CompiledLevel
+import asserts.sourse.settings as settings
 from asserts.sourse.csv_reader import CsvOpen
 
 LEVELS = (
@@ -19,14 +23,30 @@ def load_csv(file_path) -> mapT:
     return data
 
 
-def load_level(level: int) -> Optional[Tuple[Vector2, Vector2, mapT]]:
+def load_level_data(level: int, auto_tiled: Optional[bool] = None) -> Optional[CompiledLevel]:
+    """
+    Loads the compiled level, compiling it first if the csv is newer or it was compiled with other auto tiling.\n
+    :param auto_tiled: derive the wall and spike variants with auto_tile, None for settings.AUTO_TILE_LEVELS
+    """
     str_l = f"asserts/maps/level{level}.csv"
     if str_l not in LEVELS:
         return None
-    csv = load_csv(str_l)
-    # noinspection PyTypeChecker
-    info: Tuple[int, int, int, int] = tuple(csv[0])
-    spawn = Vector2(float(info[0]), float(info[1]))
-    win = Vector2(float(info[2]), float(info[3]))
-    rest: mapT = csv[1:]
-    return spawn, win, rest
+    if auto_tiled is None:
+        auto_tiled = settings.AUTO_TILE_LEVELS
+    if level_compiler.is_outdated(str_l, auto_tiled):
+        try:
+            level_compiler.write(str_l, auto_tiled)
+        except OSError:
+            return CompiledLevel(level_compiler.compile_csv(str_l, auto_tiled))
+    try:
+        return level_compiler.load(level_compiler.compiled_path(str_l))
+    except (OSError, ValueError, struct.error):
+        # unreadable or damaged compiled level, the csv is the source
+        return CompiledLevel(level_compiler.compile_csv(str_l, auto_tiled))
+
+
+def load_level(level: int) -> Optional[Tuple[Vector2, Vector2, mapT]]:
+    data = load_level_data(level)
+    if data is None:
+        return None
+    return data.spawn, data.win, data.map
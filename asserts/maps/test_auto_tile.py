@@ -0,0 +1,105 @@
+import os
+import random
+import shutil
+import tempfile
+import threading
+from unittest import TestCase
+
+import pygame as p
+
+import asserts.graphics.graphics_manager as graphics
+import asserts.maps.auto_tile as auto_tile
+from asserts.maps import level_compiler
+from asserts.maps.auto_tile import AutoTiler
+from asserts.maps.maps_manager import load_csv
+from asserts.sourse.collisions import TILE_CLASSES, EMPTY, WALL, SPIKE, WIN
+
+
+class TestAutoTile(TestCase):
+    def random_classes(self, rows: int, columns: int):
+        rng = random.Random(rows * columns)
+        return [[rng.choice((EMPTY, EMPTY, WALL, WALL, SPIKE, WIN)) for _ in range(columns)] for _ in range(rows)]
+
+    def per_cell(self, classes):
+        np = auto_tile.np
+        auto_tile.np = None
+        try:
+            return auto_tile.auto_tile(classes)
+        finally:
+            auto_tile.np = np
+
+    def test_levels(self):
+        for level in (1, 2, 3):
+            tiles = load_csv(f"asserts/maps/level{level}.csv")[1:]
+            derived = auto_tile.auto_tile([[TILE_CLASSES[t] for t in row] for row in tiles])
+            differ = [(x, y) for x, row in enumerate(tiles) for y, t in enumerate(row) if derived[x][y] != t]
+            # level 1 has a flat top wall under its pillar instead of a center one
+            self.assertEqual(differ, [(5, 4)] if level == 1 else [], level)
+
+    def test_vectorized_matches_per_cell(self):
+        if auto_tile.np is None:
+            self.skipTest("numpy is not installed")
+        for rows, columns in ((1, 1), (3, 7), (20, 20)):
+            classes = self.random_classes(rows, columns)
+            self.assertEqual(auto_tile.auto_tile(classes), self.per_cell(classes), (rows, columns))
+
+    def test_incremental(self):
+        classes = self.random_classes(12, 9)
+        tiler = AutoTiler(classes)
+        rng = random.Random(1)
+        for _ in range(200):
+            x, y = rng.randrange(12), rng.randrange(9)
+            before = [row[:] for row in tiler.tiles]
+            changed = tiler.set(x, y, rng.choice((EMPTY, WALL, SPIKE)))
+            self.assertEqual(tiler.tiles, self.per_cell(tiler.classes))
+            self.assertEqual(sorted(changed), sorted((i, j) for i in range(12) for j in range(9)
+                                                     if before[i][j] != tiler.tiles[i][j]))
+
+    def test_compiled_flag(self):
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = shutil.copy("asserts/maps/level1.csv", directory)
+            level_compiler.write(csv_path)
+            self.assertFalse(level_compiler.is_outdated(csv_path, False))
+            self.assertTrue(level_compiler.is_outdated(csv_path, True))
+            level_compiler.write(csv_path, True)
+            self.assertFalse(level_compiler.is_outdated(csv_path, True))
+            level = level_compiler.load(level_compiler.compiled_path(csv_path))
+            self.assertTrue(level.auto_tiled)
+            tiles = load_csv(csv_path)[1:]
+            self.assertEqual(level.map, auto_tile.auto_tile([[TILE_CLASSES[t] for t in row] for row in tiles]))
+            level.close()
+
+    def test_grid_too_large(self):
+        rows = level_compiler.MAX_TILES
+        classes = [[EMPTY]] * (rows - 1) + [[WALL]]
+        boxes = level_compiler.CompiledLevel(level_compiler.compile_grid((0, 0), (0, 0), classes)).hit_boxes()[0]
+        self.assertEqual(boxes[-1][0], (rows - 1) * 32)
+        with self.assertRaises(ValueError):
+            level_compiler.compile_grid((0, 0), (0, 0), classes + [[WALL]])
+        with self.assertRaises(ValueError):
+            level_compiler.compile_map((0, 0), (0, 0), classes + [[WALL]])
+
+    def test_tiles_have_frames(self):
+        p.display.init()
+        self.addCleanup(p.display.quit)
+        p.display.set_mode((1, 1))
+        cache = graphics.SurfaceCache(0)
+        atlas = graphics.Atlas.load()
+        for name in {graphics.SPRITES[t] for row in auto_tile.TILE_TABLE for t in row}:
+            self.assertTrue(all(map(os.path.exists, graphics.frame_files(os.path.join("asserts/graphics", name)))), name)
+            if atlas is not None:
+                self.assertIn(name, atlas)
+            self.assertEqual(len(cache.get(name)), 4, name)
+
+    def test_concurrent_writes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = shutil.copy("asserts/maps/level1.csv", directory)
+            expected = level_compiler.compile_csv(csv_path)
+            threads = [threading.Thread(target=level_compiler.write, args=(csv_path,)) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            with open(level_compiler.compiled_path(csv_path), "rb") as file:
+                self.assertEqual(file.read(), expected)
+            self.assertEqual(sorted(os.listdir(directory)), ["level1.csv", "level1.lvl"])
@@ -1,58 +1,306 @@
+import os
+import sys
+import threading
+import time
 from enum import Enum
 from os.path import abspath
-from typing import Union
+from typing import Union, Dict, List, Optional, Iterable, BinaryIO
 
 import pygame as p
 
+import asserts.sourse.settings as settings
+
 
 class Sounds(Enum):
     bgm = abspath("") + "/asserts/sounds/" + "bgm.wav"
 
 
+soundT = Union[str, Sounds]
+
+
+class SoundBank:
+    """
+    Every sound file is decoded once and the p.mixer.Sound is shared by all players.
+    """
+
+    def __init__(self):
+        self.sounds: Dict[str, p.mixer.Sound] = {}
+        self._lock = threading.Lock()
+
+    def get(self, sound: soundT) -> p.mixer.Sound:
+        path = sound.value if isinstance(sound, Sounds) else sound
+        decoded = self.sounds.get(path)
+        if decoded is None:
+            with self._lock:
+                decoded = self.sounds.get(path)
+                if decoded is None:
+                    decoded = self.sounds[path] = p.mixer.Sound(path)
+        return decoded
+
+    def preload(self, sounds: Iterable[soundT] = Sounds):
+        """
+        Decodes the sounds ahead, so playing them later does not touch the disk.
+        """
+        for sound in sounds:
+            self.get(sound)
+
+    def clear(self):
+        with self._lock:
+            self.sounds.clear()
+
+
+class ChannelPool:
+    """
+    Fixed number of mixer channels, set once on first use.\n
+    The first `reserved` channels are fixed layers (music), the rest are handed out to sound effects, when all of them
+    are busy the one playing the lowest priority (then the oldest) sound is stopped, if it is not above the new one.
+    """
+
+    def __init__(self, size: int, reserved: int = 0):
+        self.size = size
+        self.reserved = reserved
+        self.channels: List[p.mixer.Channel] = []
+        self.priorities: List[int] = []
+        self.started: List[int] = []
+        self.owners: List[object] = []
+        self.stolen = 0
+        self._count = 0
+
+    def _setup(self):
+        if self.channels:
+            return
+        p.mixer.set_num_channels(self.size)
+        p.mixer.set_reserved(self.reserved)
+        self.channels = [p.mixer.Channel(i) for i in range(self.reserved, self.size)]
+        self.priorities = [0] * len(self.channels)
+        self.started = [0] * len(self.channels)
+        self.owners = [None] * len(self.channels)
+
+    def layer(self, layer: int) -> p.mixer.Channel:
+        """
+        :param layer: reserved channel index, 0 to reserved - 1
+        """
+        if not 0 <= layer < self.reserved:
+            raise ValueError(f"sound layer {layer} is not one of the {self.reserved} reserved channels")
+        self._setup()
+        return p.mixer.Channel(layer)
+
+    def acquire(self, priority: int = 0, owner: object = None) -> Optional[p.mixer.Channel]:
+        """
+        :param owner: whoever plays on the channel, see owns
+        :return: free or stolen channel, None if every channel plays something more important
+        """
+        self._setup()
+        chosen = None
+        for i, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                chosen = i
+                break
+            if self.priorities[i] <= priority and (
+                    chosen is None or (self.priorities[i], self.started[i]) < (self.priorities[chosen],
+                                                                               self.started[chosen])):
+                chosen = i
+        if chosen is None:
+            return None
+        channel = self.channels[chosen]
+        if channel.get_busy():
+            channel.stop()
+            self.stolen += 1
+        self._count += 1
+        self.priorities[chosen] = priority
+        self.started[chosen] = self._count
+        self.owners[chosen] = owner
+        return channel
+
+    def owns(self, channel: p.mixer.Channel, owner: object) -> bool:
+        """
+        False once the channel was stolen for another sound.
+        """
+        return any(c is channel and o is owner for c, o in zip(self.channels, self.owners))
+
+    def play(self, sound: p.mixer.Sound, priority: int = 0, loops: int = 0, max_time: int = 0,
+             fade_ms: int = 0, owner: object = None) -> Optional[p.mixer.Channel]:
+        channel = self.acquire(priority, owner)
+        if channel is not None:
+            channel.play(sound, loops, max_time, fade_ms)
+        return channel
+
+
+sound_bank = SoundBank()
+channel_pool = ChannelPool(settings.MIXER_CHANNELS, settings.MIXER_RESERVED_CHANNELS)
+
+
 class SoundPlayer:
-    def __init__(self, sound_path: Union[str, Sounds], loops: int = 0, sound_layer: int = -1, max_time: int = 0,
-                 fade_ms: int = 0):
+    def __init__(self, sound_path: soundT, loops: int = 0, sound_layer: int = -1, max_time: int = 0,
+                 fade_ms: int = 0, priority: int = 0):
+        """
+        :param sound_layer: reserved channel to always play on, -1 to take one from the channel pool on every play
+        :param priority: channel pool priority, higher sounds stop lower ones when all channels are busy
+        """
         self.sound_path = sound_path.value if isinstance(sound_path, Sounds) else sound_path
-        self.sound_layer = self._get_fixed_sound_layer(sound_layer)
+        self.sound_layer = sound_layer
         self.loops = loops
-        self.sound = p.mixer.Sound(self.sound_path)
-        self.channel = p.mixer.Channel(self.sound_layer)
+        self.sound = sound_bank.get(self.sound_path)
+        self.channel: Optional[p.mixer.Channel] = channel_pool.layer(sound_layer) if sound_layer >= 0 else None
         self.max_time = max_time
         self.fade_ms = fade_ms
+        self.priority = priority
+
+    @property
+    def _playing(self) -> Optional[p.mixer.Channel]:
+        # a pool channel may have been stolen and play another sound by now
+        if self.channel is not None and (self.sound_layer >= 0 or channel_pool.owns(self.channel, self)):
+            return self.channel
+        return None
 
     def play(self):
-        self.channel.play(self.sound, self.loops, self.max_time, self.fade_ms)
+        if self.sound_layer >= 0:
+            self.channel.play(self.sound, self.loops, self.max_time, self.fade_ms)
+        else:
+            self.channel = channel_pool.play(self.sound, self.priority, self.loops, self.max_time, self.fade_ms, self)
 
     def stop(self):
-        self.channel.stop()
+        if self._playing is not None:
+            self.channel.stop()
 
     def pause(self):
-        self.channel.pause()
+        if self._playing is not None:
+            self.channel.pause()
 
     def unpause(self):
-        self.channel.unpause()
+        if self._playing is not None:
+            self.channel.unpause()
 
     def set_volume(self, *args, **kwargs):
-        self.channel.set_volume(*args, **kwargs)
+        if self._playing is not None:
+            self.channel.set_volume(*args, **kwargs)
 
     def fadeout(self, time: int):
-        self.channel.fadeout(time)
+        if self._playing is not None:
+            self.channel.fadeout(time)
 
     def get_volume(self):
-        return self.channel.get_volume()
+        return self.channel.get_volume() if self._playing is not None else 0.0
 
     def get_busy(self):
-        return self.channel.get_busy()
-
-    @staticmethod
-    def _get_fixed_sound_layer(layer: int) -> int:
-        max_layers = p.mixer.get_num_channels()
-        if layer < 0:
-            new_l = max_layers + 2
-            p.mixer.set_num_channels(new_l)
-            return new_l - 1
-        if layer > max_layers:
-            p.mixer.set_num_channels(layer + 1)
-            max_layers = p.mixer.get_num_channels()
-            return max_layers
-        return layer
+        return self._playing is not None and self.channel.get_busy()
+
+
+def level_track(level: int) -> str:
+    return abspath("") + "/asserts/sounds/" + settings.LEVEL_MUSIC.get(level, settings.DEFAULT_MUSIC)
+
+
+class MusicPlayer:
+    """
+    Background music streamed by p.mixer.music, only a small decode buffer is in memory instead of the whole track.
+
+    p.mixer.music plays a single stream, so changing the track fades the old one out and then the new one in instead
+    of overlapping them, a real crossfade would need two fully decoded Sounds. The fades are driven by update() and
+    loading the next track (which reads and parses its start) runs on a worker thread, nothing on the game loop waits
+    for either. The next track can be opened ahead with prefetch.
+    """
+
+    def __init__(self, fade_ms: int = 1000, loops: int = -1):
+        self.fade_ms = fade_ms
+        self.loops = loops
+        self.track: Optional[str] = None
+        self.next_track: Optional[str] = None
+        self._switch_at = 0.0
+        self._fading = False
+        self._opened: Dict[str, BinaryIO] = {}
+        self._lock = threading.Lock()
+        self._loader: Optional[threading.Thread] = None
+
+    def prefetch(self, path: str):
+        """
+        Opens the track and warms the disk cache with its start on a worker thread.
+        """
+        if path == self.track or path in self._opened or not os.path.exists(path):
+            return
+        threading.Thread(target=self._open, args=(path,), name=f"prefetch {os.path.basename(path)}",
+                         daemon=True).start()
+
+    def _open(self, path: str) -> BinaryIO:
+        file = open(path, "rb")
+        file.read(settings.MUSIC_PREFETCH_BYTES)
+        file.seek(0)
+        with self._lock:
+            old = self._opened.pop(path, None)
+            self._opened[path] = file
+        if old is not None:
+            old.close()
+        return file
+
+    def _take(self, path: str) -> BinaryIO:
+        with self._lock:
+            file = self._opened.pop(path, None)
+            stale = list(self._opened.values())
+            self._opened.clear()
+        for other in stale:
+            other.close()
+        return file if file is not None else open(path, "rb")
+
+    @property
+    def loading(self) -> bool:
+        return self._loader is not None and self._loader.is_alive()
+
+    def play(self, path: str):
+        if path == (self.next_track or self.track):
+            return
+        if self.loading or (self.track is not None and p.mixer.music.get_busy()):
+            if not self.loading and not self._fading:
+                self._fade_out()
+            self.next_track = path
+            return
+        self._start(path)
+
+    def _fade_out(self):
+        p.mixer.music.fadeout(self.fade_ms // 2)
+        self._fading = True
+        self._switch_at = time.monotonic() + self.fade_ms / 2000
+
+    def play_level(self, level: int):
+        self.play(level_track(level))
+        self.prefetch(level_track(level + 1))
+
+    def _start(self, path: str):
+        self.next_track = None
+        self.track = path
+        self._fading = False
+        self._loader = threading.Thread(target=self._load, args=(path,), name=f"load {os.path.basename(path)}",
+                                        daemon=True)
+        self._loader.start()
+
+    def _load(self, path: str):
+        try:
+            file = self._take(path)
+            with self._lock:
+                # stopped or switched again meanwhile
+                if self.track != path:
+                    file.close()
+                    return
+                p.mixer.music.load(file, os.path.basename(path))
+                p.mixer.music.play(self.loops, fade_ms=self.fade_ms // 2)
+        except (OSError, p.error) as e:
+            print(f"music: could not play {path}: {e}", file=sys.stderr)
+
+    def update(self):
+        """
+        Call every tick, starts loading the next track once the old one faded out.
+        """
+        if self.next_track is None or self.loading:
+            return
+        if p.mixer.music.get_busy():
+            if not self._fading:
+                # asked for while the last track was loading
+                self._fade_out()
+                return
+            if time.monotonic() < self._switch_at:
+                return
+        self._start(self.next_track)
+
+    def stop(self):
+        with self._lock:
+            p.mixer.music.stop()
+            self.track = self.next_track = None
+            self._fading = False
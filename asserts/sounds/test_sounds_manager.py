@@ -0,0 +1,55 @@
+import os
+from unittest import TestCase
+
+import pygame as p
+
+from asserts.sounds.sounds_manager import ChannelPool
+
+
+class TestChannelPool(TestCase):
+    def setUp(self):
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+        p.mixer.init(22050, -16, 1)
+        self.addCleanup(p.mixer.quit)
+        # a second of silence, played looping so channels stay busy
+        self.sound = p.mixer.Sound(buffer=bytes(2 * 22050))
+        self.pool = ChannelPool(3)
+
+    def play(self, priority: int, owner: object):
+        return self.pool.play(self.sound, priority, loops=-1, owner=owner)
+
+    def test_steals_lowest_priority_then_oldest(self):
+        a, b, c = object(), object(), object()
+        first = self.play(1, a)
+        self.play(2, b)
+        third = self.play(1, c)
+        self.assertEqual(len({id(ch) for ch in (first, third)}), 2)
+
+        d = object()
+        stolen = self.play(1, d)
+        # both priority 1 channels are candidates, the older one goes
+        self.assertIs(stolen, first)
+        self.assertEqual(self.pool.stolen, 1)
+        self.assertFalse(self.pool.owns(first, a))
+        self.assertTrue(self.pool.owns(first, d))
+        self.assertTrue(self.pool.owns(third, c))
+
+        e = object()
+        self.assertIs(self.play(5, e), third)
+        self.assertFalse(self.pool.owns(third, c))
+        self.assertEqual(self.pool.stolen, 2)
+
+    def test_refuses_lower_priority(self):
+        for owner in range(3):
+            self.play(3, owner)
+        self.assertIsNone(self.pool.acquire(2))
+        self.assertIsNone(self.play(0, "quiet"))
+        self.assertEqual(self.pool.stolen, 0)
+        self.assertTrue(all(self.pool.owns(ch, o) for ch, o in zip(self.pool.channels, range(3))))
+
+    def test_free_channel_first(self):
+        owner = object()
+        channel = self.play(0, owner)
+        channel.stop()
+        self.assertIs(self.play(0, "next"), channel)
+        self.assertEqual(self.pool.stolen, 0)
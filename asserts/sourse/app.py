@@ -1,6 +1,8 @@
+import threading
+import time
+from collections import OrderedDict
 from enum import Enum
-from typing import Union, Sequence, List, Tuple, Optional, AnyStr as StrPath, Callable, Literal
-from json import load, dumps
+from typing import Union, Sequence, List, Tuple, Optional, AnyStr as StrPath, Callable, Literal, Dict
 
 import pygame as p
 from pygame.math import Vector2
@@ -11,17 +13,26 @@ import asserts.graphics.graphics_manager as graphics
 import asserts.maps.maps_manager as maps
 import asserts.sourse.base_app as base_app
 import asserts.sourse.settings as settings
-from asserts.graphics.graphics_manager import AnimatedSprite, MultipleStateAnimatedSprite
-from asserts.sounds.sounds_manager import Sounds, SoundPlayer
+from asserts.sounds.sounds_manager import MusicPlayer
 from asserts.sourse.button import Button
+from asserts.sourse.collisions import TileGrid, BatchCollider, WALL, SPIKE, WIN
+from asserts.sourse.ghosts import GhostManager
+from asserts.sourse.history import MoveHistory
+from asserts.sourse.profiler import DebugSink, FrameTimer
+from asserts.sourse.records import RecordsStore
+from asserts.sourse.replay import Recorder, checksum
+
+
+debug_sink = DebugSink(settings.DEBUG_SAMPLE_EVERY)
 
 
 # noinspection PyUnusedLocal,PyUnreachableCode
 def print_debug(*args):
     if __debug__:
-        print(*args)
+        debug_sink.write(*args)
 
 
+# camera offset in map axes like every position: x is the screen row (vertical), y the screen column (horizontal)
 move = Vector2()
 
 
@@ -32,9 +43,12 @@ class Player(Sprite):
         self.sprite = player_sprite
         self.app = app
         self.__pos = Vector2(x, y)
+        self.prev_pos = Vector2(x, y)
+        self.step_pos = Vector2(x, y)
         self.time = 0
         self.hit_box = hit_box.copy() if hit_box else player_sprite.image.get_rect()
-        self.cache: List[Vector2] = [self.pos]
+        self.cache = MoveHistory(settings.PLAYER_HISTORY_CAP, settings.PLAYER_HISTORY_DELTA)
+        self.cache.append(self.pos)
         self.vel = Vector2()
         self.on_ground = False
         self.touch_wall = False
@@ -82,24 +96,28 @@ class Player(Sprite):
         #     self.vel = self.vel * self.global_friction
 
     def get_debug(self) -> Tuple[bool, bool, bool, bool, bool]:
-        center = self.collide_with_walls()
-        self.hit_box.x -= settings.PLAYER_MOVE_CHECK_RANGE
-        left = self.collide_with_walls()
-        self.hit_box.x += settings.PLAYER_MOVE_CHECK_RANGE * 2
-        right = self.collide_with_walls()
-        self.hit_box.x -= settings.PLAYER_MOVE_CHECK_RANGE
-        self.hit_box.y += settings.PLAYER_MOVE_CHECK_RANGE
-        top = self.collide_with_walls()
-        self.hit_box.y -= settings.PLAYER_MOVE_CHECK_RANGE * 2
-        down = self.collide_with_walls()
-        self.hit_box.y += settings.PLAYER_MOVE_CHECK_RANGE
-
-        return center, left, right, top, down
+        r = settings.PLAYER_MOVE_CHECK_RANGE
+        # center, left, right, top, down
+        # noinspection PyTypeChecker
+        return self.level.grid.probe(self.hit_box, ((0, 0), (-r, 0), (r, 0), (0, r), (0, -r)), WALL)
 
     def respawn(self):
         self.__pos = Vector2(self.spawn)
+        self.snap()
         # pass
 
+    def snap(self):
+        self.prev_pos = Vector2(self.pos)
+        self.step_pos = Vector2(self.pos)
+
+    def end_step(self):
+        self.prev_pos = self.step_pos
+        self.step_pos = Vector2(self.pos)
+
+    @property
+    def draw_pos(self) -> Vector2:
+        return self.prev_pos.lerp(self.step_pos, self.app.alpha)
+
     def update(self):
         center, left, right, top, down = self.get_debug()
         self.on_ground = down
@@ -108,21 +126,21 @@ class Player(Sprite):
         self.sprite.goto(*self.pos)
 
     def collide_with_walls(self):
-        return bool(self.hit_box.collidelistall(self.level.walls_hit_box()))
+        return self.level.grid.collide(self.hit_box, WALL)
 
     def save_to_cache(self):
         self.cache.append(self.pos)
 
     @property
     def is_dead(self) -> bool:
-        return bool(self.hit_box.collidelist(self.level.spikes_hit_box()))
+        return self.level.grid.collide(self.hit_box, SPIKE)
 
     def kill(self):
         return KilledPlayer(self)
 
     def loop(self):
         # noinspection PyUnreachableCode
-        if __debug__:
+        if __debug__ and not self.app.headless and debug_sink.sample():
             def f(var: Union[str, int, float, Vector2, Callable], n, r=False, t=False):
                 """
 
@@ -148,9 +166,11 @@ class Player(Sprite):
             print_debug(f(self.pos, "pos", t=True), f(self.jumping, "jumping", r=True), f(get_cursor_pos, "cursor pos"),
                         f(self.time, "time"))
         self.update()
-        if self.is_dead:
+        hits = self.level.collide_bodies([self.hit_box], (SPIKE, WIN))
+        if hits[SPIKE][0]:
             self.level.add_dead_player(self.kill())
-        if self.hit_box.collidelistall(self.level.wins_hit_box()):
+        if hits[WIN][0]:
+            self.app.save()
             self.level.next_level()
 
     # noinspection PyMethodMayBeStatic
@@ -195,8 +215,13 @@ class Player(Sprite):
             if self.jumper is not None:
                 self.jump()
 
+    @property
+    def screen_rect(self) -> p.Rect:
+        pos = self.draw_pos
+        return self.image.get_rect(topleft=(round(pos[1] * 32 + move.y), round(pos[0] * 32 + move.x)))
+
     def draw(self):
-        self.screen.blit(self.image, (self.pos[1] * 32 + move.y, self.pos[0] * 32 + move.x))
+        self.screen.blit(self.image, self.screen_rect)
         # pass
         # self.screen.blit(self.image, (self.pos[0] + move.y, self.pos[1] + move.x))
 
@@ -205,10 +230,10 @@ class KilledPlayer:
 
     def __init__(self, player: Player):
         self.time = 0
-        self.cache = player.cache
-        self.__spawn = player.spawn
-        self.__pos = player.pos
-        self.__end_pos = player.pos
+        self.cache = player.cache.snapshot()
+        self.__spawn = Vector2(player.spawn)
+        self.__pos = self.cache[0]
+        self.__end_pos = Vector2(player.pos)
         self.__go = True
 
     @property
@@ -219,9 +244,13 @@ class KilledPlayer:
     def pos(self):
         return self.__pos
 
+    @property
+    def end_pos(self):
+        return self.__end_pos
+
     def load_from_cache(self):
         if self.__go:
-            if self.pos == self.__end_pos:
+            if self.pos == self.__end_pos or self.time >= len(self.cache):
                 self.__go = False
             else:
                 self.__pos = self.cache[self.time]
@@ -231,31 +260,62 @@ class KilledPlayer:
         self.load_from_cache()
 
     def respawn(self):
-        self.__pos = self.__spawn
+        self.__pos = Vector2(self.__spawn)
+        self.time = 0
+        self.__go = True
 
     def draw(self):
         pass
 
 
-class GlobalizedSprites(p.sprite.Group):
-    def __init__(self, *sprites: Union[Sprite, Sequence[Sprite]]):
-        super().__init__(*sprites)
-        self.global_pos = Vector2()
+class TileLayer:
+    """
+    Tiles pre-rendered once per animation frame, so drawing them is a single blit.
+    """
 
-    def update(self, *args, **kwargs) -> None:
-        # noinspection PyTypeChecker
-        e: List[Union[graphics.AnimatedSprite, graphics.MultipleStateAnimatedSprite]] = self.sprites()
-        for v in e:
-            v.set_offset(*self.global_pos.xy)
-        super().update(*args, **kwargs)
+    def __init__(self, render: Callable[[int], p.Surface]):
+        self.render = render
+        self.frames: Dict[int, p.Surface] = {}
 
-    def get_hit_boxes(self):
-        # noinspection PyTypeChecker
-        e: List[Union[graphics.AnimatedSprite, graphics.MultipleStateAnimatedSprite]] = self.sprites()
-        ret: List[p.Rect] = []
-        for v in e:
-            ret.append(v.hit_box)
-        return ret
+    def invalidate(self):
+        self.frames.clear()
+
+    def get(self, frame: int) -> p.Surface:
+        surface = self.frames.get(frame)
+        if surface is None:
+            surface = self.frames[frame] = self.render(frame)
+        return surface
+
+
+class TileChunk:
+    """
+    Square of settings.CHUNK_SIZE tiles with its own pre-rendered layer, drawn straight from the level tile id grid
+    and the shared tile types.\n
+    rect is in screen space without the camera offset, map y is the screen column.
+    """
+
+    def __init__(self, level: "Level", x: int, y: int):
+        size = settings.CHUNK_SIZE
+        self.level = level
+        self.pos = (x, y)
+        self.rows = range(x * size, min((x + 1) * size, level.width))
+        self.cols = range(y * size, min((y + 1) * size, level.height))
+        self.rect = p.Rect(y * size * 32, x * size * 32, len(self.cols) * 32, len(self.rows) * 32)
+        self.layer = TileLayer(self.render)
+
+    def render(self, frame: int) -> p.Surface:
+        surface = p.Surface(self.rect.size, p.SRCALPHA)
+        ids = self.level.tile_ids
+        height = self.level.height
+        x0, y0 = self.rows.start, self.cols.start
+        cells = [(ids[tx * height + ty], ((ty - y0) * 32, (tx - x0) * 32)) for tx in self.rows for ty in self.cols]
+        # one surface cache lookup per tile id, not per cell
+        tiles = {tile_id: graphics.get_tile_type(tile_id).frame(frame) for tile_id in {c[0] for c in cells}}
+        surface.blits([(tiles[tile_id], pos) for tile_id, pos in cells], False)
+        return surface
+
+    def unload(self):
+        self.layer.invalidate()
 
 
 class EndGame(Exception):
@@ -286,90 +346,284 @@ class Level(Screen):
     levels = range(3)
     levels_len = {1: 15, 2: 10, 3: 10}
 
-    def __init__(self, level: int, app: "App"):
+    def __init__(self, level: int, app: "App", data: Optional[maps.CompiledLevel] = None):
+        """
+        :param data: the loaded level file, loaded here if None
+        """
         super(Level, self).__init__(app)
         if level not in self.levels:
             raise EndGame(True)
-        le = maps.load_level(level)
-        self.spawn = le[0]
-        self.win_cords = le[1]
-        self.map: List[List[Union[int, float]]] = le[2]
-        self.map_sprites_group = GlobalizedSprites()
-        self.win_sprite = graphics.get_sprite("win", settings.MAX_ANIMATION_TICKS, self.win_cords.x * 32,
-                                              self.win_cords.y * 32)
-        self.win_group = p.sprite.Group()
-        self.walls = p.sprite.Group()
-        self.spikes = p.sprite.Group()
-        for x in range(len(self.map)):
-            for y in range(len(self.map[x])):
-                self.add_tile(graphics.get_sprite(graphics.SPRITES[self.map[x][y]],
-                                                  settings.MAX_ANIMATION_TICKS, x * 32, y * 32),
-                              graphics.SPRITES[self.map[x][y]], Vector2(x, y))
-        self.memories = []
+        if data is None:
+            data = maps.load_level_data(level)
+        self.spawn = data.spawn
+        self.win_cords = data.win
+        # tile id grid, map x is the row, cells are drawn from the shared graphics.TileType of their id
+        self.width = data.width
+        self.height = data.height
+        self.tile_ids = bytes(data.tiles)
+        self._map: Optional[List[List[int]]] = None
+        # map x and y are screen rows and columns, chunks are keyed the same way
+        self.chunks: Dict[Tuple[int, int], TileChunk] = {}
+        self.chunk_rows = -(-self.width // settings.CHUNK_SIZE)
+        self.chunk_cols = -(-self.height // settings.CHUNK_SIZE)
+        self.grid = TileGrid.from_masks(data.width, data.height, data.masks)
+        self.collider = BatchCollider(*data.hit_boxes())
+        data.close()
+        self.clock = graphics.AnimationClock(settings.MAX_ANIMATION_TICKS, settings.TILE_ANIMATION_STEPS)
+        self.memories = GhostManager()
+        self._ghost_image: Optional[p.Surface] = None
         self.level = level
         self.level_len = self.levels_len[self.level]
 
-    # noinspection PyUnusedLocal,GrazieInspection
-    def add_tile(self, tile: AnimatedSprite, tile_name, pos: Vector2):
-        self.map_sprites_group.add(tile)
-        if tile_name in graphics.SPIKES:
-            self.spikes.add(tile)
-        if tile_name in graphics.WALLS:
-            self.walls.add(tile)
-        if tile_name == graphics.WIN:
-            self.win_group.add(tile)
+    @property
+    def map(self) -> List[List[int]]:
+        """
+        Tile id rows, built once, do not change them.
+        """
+        if self._map is None:
+            self._map = [list(self.tile_ids[x * self.height:(x + 1) * self.height]) for x in range(self.width)]
+        return self._map
+
+    def add_dead_player(self, dead_player: KilledPlayer):
+        self.memories.add(dead_player.cache, dead_player.end_pos)
+        self.app.records.add_death(self.level)
 
-    def add_dead_player(self, cache):
-        self.memories.append(cache)
+    @property
+    def ghost_image(self) -> p.Surface:
+        if self._ghost_image is None:
+            self._ghost_image = graphics.load_frames("player_idle")[0].copy()
+            self._ghost_image.set_alpha(settings.GHOST_ALPHA)
+        return self._ghost_image
+
+    def collide_bodies(self, bodies: Sequence[p.Rect], masks: Sequence[int] = (WALL, SPIKE, WIN)) \
+            -> Dict[int, List[bool]]:
+        # below the crossover measured by benchmarks.collisions the grid lookups are cheaper than one numpy call
+        if len(bodies) < settings.BATCH_COLLISION_MIN_BODIES:
+            return {mask: [self.grid.collide(body, mask) for body in bodies] for mask in masks}
+        return self.collider.collide_classes(bodies, masks)
 
     def walls_hit_box(self):
-        ret = []
-        e: Union[MultipleStateAnimatedSprite, AnimatedSprite]
-        for e in self.walls.sprites():
-            ret.append(e.hit_box)
-        return ret
+        return self.grid.hit_boxes(WALL)
 
     def spikes_hit_box(self):
-        ret = []
-        e: Union[MultipleStateAnimatedSprite, AnimatedSprite]
-        for e in self.spikes.sprites():
-            ret.append(e.hit_box)
-        return ret
+        return self.grid.hit_boxes(SPIKE)
 
     def wins_hit_box(self):
-        ret = []
-        e: Union[MultipleStateAnimatedSprite, AnimatedSprite]
-        for e in self.spikes.sprites():
-            if Vector2(e.x, e.y) == self.win_cords:
-                ret.append(e.hit_box)
-        return ret
+        return self.grid.hit_boxes(WIN)
 
     @property
     def screen(self):
         return self.app.screen
 
+    @property
+    def animation_frame(self) -> int:
+        return self.clock.frame
+
+    def viewport(self) -> p.Rect:
+        return p.Rect(-move.y, -move.x, *self.screen.get_size())
+
+    def _chunk_range(self, viewport: p.Rect, margin: int) -> Tuple[range, range]:
+        size = settings.CHUNK_SIZE * 32
+        return (range(max(viewport.top // size - margin, 0),
+                      min((viewport.bottom - 1) // size + margin + 1, self.chunk_rows)),
+                range(max(viewport.left // size - margin, 0),
+                      min((viewport.right - 1) // size + margin + 1, self.chunk_cols)))
+
+    def stream(self, viewport: p.Rect):
+        """
+        Creates chunks near the viewport and drops the ones far from it, the evict margin is bigger than the load one
+        so chunks on the border are not rebuilt on every camera step.
+        """
+        rows, cols = self._chunk_range(viewport, settings.CHUNK_LOAD_MARGIN)
+        for x in rows:
+            for y in cols:
+                if (x, y) not in self.chunks:
+                    self.chunks[(x, y)] = TileChunk(self, x, y)
+        rows, cols = self._chunk_range(viewport, settings.CHUNK_EVICT_MARGIN)
+        for key in [k for k in self.chunks if k[0] not in rows or k[1] not in cols]:
+            self.chunks.pop(key).unload()
+
+    def prepare(self):
+        """
+        Loads and renders everything the first frame of this level needs.
+        """
+        viewport = self.viewport()
+        self.stream(viewport)
+        for chunk in self.chunks.values():
+            if chunk.rect.colliderect(viewport):
+                chunk.layer.get(self.animation_frame)
+
     def draw(self):
-        for dead_player in self.memories:
-            dead_player.draw()
-        sprite: Union[graphics.AnimatedSprite, graphics.MultipleStateAnimatedSprite]
-        for sprite in self.map_sprites_group.sprites():
-            self.screen.blit(sprite.image, (sprite.y + move.x, sprite.x + move.y))
+        viewport = self.viewport()
+        self.stream(viewport)
+        frame = self.animation_frame
+        self.screen.blits([(chunk.layer.get(frame), (chunk.rect.x + move.y, chunk.rect.y + move.x))
+                           for chunk in self.chunks.values() if chunk.rect.colliderect(viewport)], False)
+        self.memories.draw(self.screen, self.ghost_image, (move.y, move.x))
 
     @property
     def player(self):
         return self.app.player
 
     def next_level(self):
-        self.app.level = Level(self.level + 1, self.app)
+        self.app.level = self.app.level_cache.get(self.level + 1)
+        self.app.level_started = self.app.ticks
+        if self.app.music is not None:
+            self.app.music.play_level(self.app.level.level)
         self.player.respawn()
 
     def respawn(self):
-        for dead_player in self.memories:
-            dead_player.respawn()
+        self.memories.respawn()
+
+    def reset(self):
+        """
+        Back to the state of a newly built level in place, the map, collisions and rendered chunks are kept.
+        """
+        self.memories.clear()
+        self.clock.reset()
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Rough memory use, for the level cache bound. Pre-rendered chunk layers are most of it.
+        """
+        layers = sum(graphics.surface_bytes(surface) for chunk in self.chunks.values()
+                     for surface in chunk.layer.frames.values())
+        # a p.Rect and its edges per hit box
+        return len(self.tile_ids) + len(self.grid.masks) + len(self.collider) * 64 + self.memories.nbytes + layers
 
     def loop(self):
-        for dead_player in self.memories:
-            dead_player.loop()
+        self.clock.tick()
+        self.memories.loop()
+
+
+class LevelPrefetcher:
+    """
+    Reads and compiles the next level file on a worker thread while the current one is played. Surfaces are only
+    made on the main thread, SDL does not promise that is safe anywhere else, so take() builds the Level from the
+    loaded data and its chunks are rendered by the first draw.
+    """
+
+    def __init__(self, app: "App"):
+        self.app = app
+        self.level: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._data: Optional[maps.CompiledLevel] = None
+        self._error: Optional[BaseException] = None
+
+    def prefetch(self, level: int):
+        """
+        Starts loading level, a load still running for another level is left to finish and thrown away.
+        """
+        if level not in Level.levels or level in self.app.level_cache:
+            return
+        with self._lock:
+            if self.level == level:
+                return
+            self._discard()
+            self.level = level
+        self._thread = threading.Thread(target=self._load, args=(level,), name=f"prefetch level {level}",
+                                        daemon=True)
+        self._thread.start()
+
+    def _load(self, level: int):
+        data = error = None
+        try:
+            data = maps.load_level_data(level)
+        except BaseException as e:
+            error = e
+        with self._lock:
+            if self.level == level:
+                self._data, self._error = data, error
+                return
+        if data is not None:
+            data.close()
+
+    def _discard(self):
+        if self._data is not None:
+            self._data.close()
+        self.level = self._data = self._error = None
+
+    def wait(self):
+        """
+        Blocks until the last started load is done, for tests and benchmarks, the game never waits for it.
+        """
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    @property
+    def ready(self) -> bool:
+        return self._data is not None or self._error is not None
+
+    def take(self, level: int) -> "Level":
+        """
+        Builds the level from the prefetched data, or loads it right away if it was not prefetched or is still being
+        loaded.
+        """
+        with self._lock:
+            data, error = (self._data, self._error) if self.level == level else (None, None)
+            if self.level == level:
+                # a load still running for it is thrown away once done
+                self._data = self._error = None
+                self.level = None
+        if error is not None:
+            raise error
+        return Level(level, self.app, data)
+
+
+class LevelCache:
+    """
+    Built levels by number, least recently used ones are dropped once all together use more than max_bytes.
+
+    A cached level is reset instead of being built again when it is played another time.
+    """
+
+    def __init__(self, app: "App", max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.levels: "OrderedDict[int, Level]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, level: int) -> bool:
+        return level in self.levels
+
+    def __len__(self) -> int:
+        return len(self.levels)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(level.nbytes for level in self.levels.values())
+
+    def get(self, level: int) -> Level:
+        """
+        Cached level after a reset, else the prefetched or a newly built one, then prefetches the next level.
+        """
+        built = self.levels.get(level)
+        if built is not None:
+            self.hits += 1
+            self.levels.move_to_end(level)
+            built.reset()
+        else:
+            self.misses += 1
+            built = self.app.prefetcher.take(level) if settings.PREFETCH_LEVELS else Level(level, self.app)
+            self.levels[level] = built
+            self.shrink()
+        if settings.PREFETCH_LEVELS:
+            self.app.prefetcher.prefetch(level + 1)
+        return built
+
+    def shrink(self):
+        # the newest level always stays
+        while len(self.levels) > 1 and self.nbytes > self.max_bytes:
+            self.levels.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.levels.clear()
 
 
 class MainScreen(Screen):
@@ -433,18 +687,54 @@ class Screens(Enum):
 class App(base_app.BaseApp):
     def __init__(self, title="load again", icon_path: StrPath = "../graphics/icon.png", play_sound: bool = True,
                  height: int = 300, width: int = 300, bg_color: Tuple[int, int, int] = (0, 0, 0),
-                 create_new_screen: bool = True):
-        super().__init__(title, icon_path, height, width, bg_color, create_new_screen)
-        self.level = Level(1, self)
-        self.settings = SettingsScreen(self)
-        self.main = MainScreen(self)
-        self.player = Player(self.level.spawn.x, self.level.spawn.y,
-                             graphics.get_player_sprite(settings.PLAYER_ANIMATION_TICKS, *self.level.spawn), self,
-                             p.Rect(*self.level.spawn, *settings.PLAYER_SIZE))
-        if play_sound:
-            self.sound_player = SoundPlayer(Sounds.bgm, -1)
-            self.sound_player.play()
+                 create_new_screen: bool = True, dirty_rects: bool = False, headless: bool = False,
+                 records_path: Optional[StrPath] = None):
+        """
+        :param records_path: file the level records are saved to, None keeps them in memory only
+        """
+        # time to the first frame by phase, see main.startup_profile
+        self.startup_timer = FrameTimer(1)
+        start = time.perf_counter()
+        super().__init__(title, icon_path, height, width, bg_color, create_new_screen, dirty_rects,
+                         settings.MAX_FPS, settings.MAX_TPS, settings.MAX_CATCH_UP_STEPS, headless)
+        self.startup_timer.add("display", (time.perf_counter() - start) * 1000)
+        self.subscribe_keys((p.K_ESCAPE,))
+        with self.startup_timer.phase("level"):
+            self.level_cache = LevelCache(self, settings.LEVEL_CACHE_MAX_BYTES)
+            self.prefetcher = LevelPrefetcher(self)
+            self.level = self.level_cache.get(1)
+        self._settings_screen: Optional[SettingsScreen] = None
+        self._main_screen: Optional[MainScreen] = None
+        with self.startup_timer.phase("player"):
+            self.player = Player(self.level.spawn.x, self.level.spawn.y,
+                                 graphics.get_player_sprite(settings.PLAYER_ANIMATION_TICKS, *self.level.spawn), self,
+                                 p.Rect(*self.level.spawn, *settings.PLAYER_SIZE))
+        with self.startup_timer.phase("music"):
+            if play_sound and not headless:
+                self.music = MusicPlayer(settings.MUSIC_FADE_MS)
+                self.music.play_level(self.level.level)
+            else:
+                self.music = None
         self.sceneType = Screens.level1
+        self._drawn_scene = None
+        self._drawn_player: Optional[Tuple[p.Rect, p.Surface]] = None
+        self._drawn_ghosts: List[Tuple[int, int]] = []
+        self.ticks = 0
+        self.level_started = 0
+        self.records = RecordsStore(records_path, settings.RECORDS_COMPACT_EVERY)
+        self.recorder: Optional[Recorder] = None
+
+    @property
+    def settings(self) -> "SettingsScreen":
+        if self._settings_screen is None:
+            self._settings_screen = SettingsScreen(self)
+        return self._settings_screen
+
+    @property
+    def main(self) -> "MainScreen":
+        if self._main_screen is None:
+            self._main_screen = MainScreen(self)
+        return self._main_screen
 
     @property
     def scene(self) -> Screen:
@@ -466,6 +756,8 @@ class App(base_app.BaseApp):
         #     self.player.right()
 
     def on_key_down(self, key_code: int):
+        if self.recorder is not None:
+            self.recorder.key(self.ticks, key_code)
         if self.sceneType.is_level():
             if key_code == p.K_ESCAPE:
                 self.change_screen("main")
@@ -478,15 +770,54 @@ class App(base_app.BaseApp):
                     self.player.right()
                 if key_code == p.K_x:
                     self.player.kill()
+                if key_code == p.K_r:
+                    self.restart_level()
 
     def on_key_up(self, key_code: int):
         pass
 
     def on_mouse_button_down(self, pos: Tuple[int, int], button_id: Literal[1, 2, 3, 4, 5]):
+        if self.recorder is not None:
+            self.recorder.click(self.ticks, pos, button_id)
         self.scene.click(pos)
 
+    def start_recording(self, path: StrPath, checksum_every: Optional[int] = None):
+        """
+        Records every following input to path, for replay.replay from the state the app is in now.
+
+        :param checksum_every: settings.REPLAY_CHECKSUM_EVERY by default
+        """
+        self.stop_recording()
+        if checksum_every is None:
+            checksum_every = settings.REPLAY_CHECKSUM_EVERY
+        self.recorder = Recorder(path, self.max_tps, checksum_every, self.ticks)
+
+    def stop_recording(self):
+        if self.recorder is not None:
+            self.recorder.close(self.ticks)
+            self.recorder = None
+
+    def state_checksum(self) -> int:
+        """
+        Checksum of the simulation state, replays compare it to find where they stop matching the recording.
+        """
+        ghosts = [c for cords in self.level.memories.cords() for c in cords]
+        return checksum(list(Screens).index(self.sceneType), self.level.level, int(self.player.pos.x),
+                        int(self.player.pos.y), self.player.time, len(self.level.memories), *ghosts)
+
+    def restart_level(self):
+        """
+        Plays the current level again from the start, without its ghosts.
+        """
+        self.level = self.level_cache.get(self.level.level)
+        self.level_started = self.ticks
+        self.player.respawn()
+
     def save(self):
-        pass
+        """
+        Records the win of the current level, the file is written on a background thread.
+        """
+        self.records.add_win(self.level.level, self.ticks - self.level_started)
 
     def game_loop(self, delta):
         if self.sceneType.is_level():
@@ -495,15 +826,38 @@ class App(base_app.BaseApp):
                 self.level.loop()
             except EndGame as e:
                 if e.win:
-                    self.save()
+                    # Player.loop saved the win before trying the next level
                     self.level.next_level()
                 self.player.respawn()
                 self.level.respawn()
+            self.player.end_step()
+        if self.music is not None:
+            self.music.update()
+        self.ticks += 1
+        if self.recorder is not None and self.recorder.wants_checksum(self.ticks):
+            self.recorder.checksum(self.ticks, self.state_checksum())
 
     def draw(self):
+        self.scene.draw()
         if self.sceneType.is_level() or True:
             self.player.draw()
-        self.scene.draw()
+
+    def update_dirty(self):
+        scene = (self.sceneType, self.scene, self.level.animation_frame, tuple(move))
+        if scene != self._drawn_scene:
+            self._drawn_scene = scene
+            self.mark_all_dirty()
+        player = (self.player.screen_rect, self.player.image)
+        if self._drawn_player is None or player[0] != self._drawn_player[0] or player[1] is not self._drawn_player[1]:
+            if self._drawn_player is not None:
+                self.mark_dirty(self._drawn_player[0])
+            self.mark_dirty(player[0])
+            self._drawn_player = player
+        ghosts = self.level.memories.screen_cords((move.y, move.x))
+        if ghosts != self._drawn_ghosts:
+            size = self.level.ghost_image.get_size()
+            self.mark_dirty(*(p.Rect(cords, size) for cords in set(ghosts).symmetric_difference(self._drawn_ghosts)))
+            self._drawn_ghosts = ghosts
 
     def change_screen(self, scene):
         if isinstance(scene, str):
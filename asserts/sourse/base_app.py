@@ -1,31 +1,94 @@
-from typing import Tuple, Literal, Optional, AnyStr as StrPath
+from functools import lru_cache
+from typing import Tuple, Literal, Optional, List, Dict, Callable, Iterable, AnyStr as StrPath
 
 import pygame
 
+from asserts.sourse.profiler import FrameTimer
+
 try:
     from asserts.graphics.graphics_manager import load_image
 except ImportError:
     def load_image(name: str):
         return pygame.image.load(name)
 
-all_keycodes = tuple(getattr(pygame.constants, key_str) for key_str in
-                     filter(lambda k: k.startswith("K_"), dir(pygame.constants)))
+
+@lru_cache(maxsize=None)
+def get_all_keycodes() -> Tuple[int, ...]:
+    return tuple(getattr(pygame.constants, key_str) for key_str in
+                 filter(lambda k: k.startswith("K_"), dir(pygame.constants)))
+
+
+def __getattr__(name: str):
+    # all_keycodes is built on first use instead of on import
+    if name == "all_keycodes":
+        return get_all_keycodes()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def merge_rects(rects: List[pygame.Rect]) -> List[pygame.Rect]:
+    """
+    Joins overlapping rects, so no region is redrawn twice.
+    """
+    ret: List[pygame.Rect] = []
+    for rect in rects:
+        rect = rect.copy()
+        i = rect.collidelist(ret)
+        while i != -1:
+            rect.union_ip(ret.pop(i))
+            i = rect.collidelist(ret)
+        ret.append(rect)
+    return ret
 
 
 class BaseApp:
     def __init__(self, title: Optional[str] = None, icon_path: Optional[StrPath] = None, height: int = 300,
-                 width: int = 300, bg_color: Tuple[int, int, int] = (0, 0, 0), create_new_screen: bool = True):
-        self.screen: pygame.Surface = pygame.display.set_mode((height, width)) \
-            if create_new_screen else pygame.display.get_surface()
-        if not self.screen:
-            self.screen = pygame.display.set_mode((height, width))
+                 width: int = 300, bg_color: Tuple[int, int, int] = (0, 0, 0), create_new_screen: bool = True,
+                 dirty_rects: bool = False, max_fps: int = 60, max_tps: int = 20, max_catch_up_steps: int = 5,
+                 headless: bool = False):
+        self.headless = headless
+        if headless:
+            # off screen surface, nothing is ever drawn on it
+            self.screen = pygame.Surface((height, width))
+        else:
+            self.screen: pygame.Surface = pygame.display.set_mode((height, width)) \
+                if create_new_screen else pygame.display.get_surface()
+            if not self.screen:
+                self.screen = pygame.display.set_mode((height, width))
         self.clock = pygame.time.Clock()
         self.delta = 0
-        self.max_tps = 20
+        self.max_fps = max_fps
+        self.max_tps = max_tps
+        self.max_catch_up_steps = max_catch_up_steps
+        self.alpha = 1.0
         self.running = True
         self.bg_color = bg_color
         self.event_info: Optional[pygame.event.Event] = None
         self.event_info_actual = False
+        self.dirty_rects = dirty_rects
+        self._dirty: List[pygame.Rect] = []
+        self._full_redraw = True
+        self.timer = FrameTimer()
+        self.show_timings = False
+        self.timings_key = pygame.K_F3
+        # ms between overlay text updates, re-rendering it every frame would show up in the timings it reports
+        self.timings_refresh_ms = 250
+        self._timings_next = 0
+        self._timings_text: List[str] = []
+        self._timings_surface: Optional[pygame.Surface] = None
+        self._timings_rect = pygame.Rect(0, 0, 0, 0)
+        self._timings_font: Optional[pygame.font.Font] = None
+        self.polled_keys: Optional[Tuple[int, ...]] = None
+        self.event_handlers: Dict[int, Callable[[pygame.event.Event], None]] = {
+            pygame.QUIT: lambda event: self.on_exit(),
+            pygame.KEYDOWN: self._on_key_down_event,
+            pygame.KEYUP: lambda event: self.on_key_up(event.key),
+            pygame.MOUSEBUTTONDOWN: lambda event: self.on_mouse_button_down(pygame.mouse.get_pos(), event.button),
+            pygame.MOUSEBUTTONUP: lambda event: self.on_mouse_button_up(pygame.mouse.get_pos(), event.button),
+            pygame.MOUSEMOTION: lambda event: self.on_mouse_move(pygame.mouse.get_pos()),
+            pygame.VIDEOEXPOSE: self._on_expose,
+        }
+        if headless:
+            return
         if icon_path:
             pygame.display.set_icon(load_image(icon_path))
         if title:
@@ -42,16 +105,12 @@ class BaseApp:
         Handles KeyboardInterrupt as exit command, but re-raises it after.
         """
         try:
+            self.clock.tick()
             while self.running:
-                # checking events
-                self.check_events()
-
-                # ticking
-                self.delta += self.clock.tick() / 1000
-                while self.delta > 1 / self.max_tps:
-                    self.delta -= 1 / self.max_tps
-                    # running loop
-                    self.loop(self.delta)
+                if self.headless:
+                    self.game_loop(1 / self.max_tps)
+                else:
+                    self.frame()
         except KeyboardInterrupt as e:
             self.on_exit()
             raise KeyboardInterrupt from e
@@ -59,22 +118,172 @@ class BaseApp:
         self.on_exit()
         return
 
-    def loop(self, delta: int):
-        # checking events
-        self.check_events()
+    def frame(self):
+        """
+        One display frame: sleeps to keep max_fps, runs as many fixed max_tps simulation steps as the elapsed time
+        needs (at most max_catch_up_steps, the rest is dropped), then renders once.\n
+        alpha is the fraction of a simulation step elapsed since the last one, to interpolate drawing with.
+        """
+        step = 1 / self.max_tps
+        # tick sleeps, the render rate is never above the simulation rate if max_fps is not set
+        self.delta += self.clock.tick(self.max_fps or self.max_tps) / 1000
 
-        # game loop
-        self.game_loop(delta)
+        with self.timer.phase("frame"):
+            # checking events
+            with self.timer.phase("events"):
+                self.check_events()
 
-        # drawing
-        self.draw_background()
-        self.draw()
+            # game loop
+            with self.timer.phase("game_loop"):
+                steps = 0
+                while self.delta >= step and self.running:
+                    if steps >= self.max_catch_up_steps:
+                        self.delta = 0
+                        break
+                    self.delta -= step
+                    self.game_loop(step)
+                    steps += 1
+            self.alpha = min(self.delta / step, 1.0)
+
+            # drawing
+            self.render()
+
+    def simulate(self, ticks: int, delta: Optional[float] = None) -> int:
+        """
+        Runs game_loop ticks times (or until exit) as fast as possible, without events, waiting and drawing.
+        :return: number of ticks done
+        """
+        delta = 1 / self.max_tps if delta is None else delta
+        done = 0
+        while done < ticks and self.running:
+            self.game_loop(delta)
+            done += 1
+        return done
+
+    def loop(self, delta: float):
+        """
+        Single simulation step followed by drawing, without waiting.
+        """
+        with self.timer.phase("frame"):
+            # checking events
+            with self.timer.phase("events"):
+                self.check_events()
 
-        pygame.display.flip()
+            # game loop
+            with self.timer.phase("game_loop"):
+                self.game_loop(delta)
+            self.alpha = 1.0
+
+            # drawing
+            self.render()
+
+    def render(self):
+        if self.headless:
+            return
+        self.update_timings()
+        if self.dirty_rects:
+            self.update_dirty()
+        if not self.dirty_rects or self._full_redraw:
+            self._full_redraw = False
+            self._dirty.clear()
+            with self.timer.phase("draw"):
+                self.draw_background()
+                self.draw()
+                self.draw_timings()
+            with self.timer.phase("flip"):
+                pygame.display.flip()
+            return
+
+        if not self._dirty:
+            return
+        rects = merge_rects(self._dirty)
+        self._dirty = []
+        with self.timer.phase("draw"):
+            clip = self.screen.get_clip()
+            for rect in rects:
+                self.screen.set_clip(rect)
+                self.draw_background()
+                self.draw()
+                self.draw_timings()
+            self.screen.set_clip(clip)
+        with self.timer.phase("flip"):
+            pygame.display.update(rects)
+
+    def update_timings(self):
+        """
+        Renders the frame timing overlay text, shown with timings_key, every timings_refresh_ms if it changed.
+        """
+        if not self.show_timings:
+            if self._timings_surface is not None:
+                self._timings_surface = None
+                self.mark_dirty(self._timings_rect)
+            return
+        now = pygame.time.get_ticks()
+        if self._timings_surface is not None and now < self._timings_next:
+            return
+        self._timings_next = now + self.timings_refresh_ms
+        text = self.timer.lines()
+        if self._timings_surface is not None and text == self._timings_text:
+            return
+        self._timings_text = text
+        if self._timings_font is None:
+            self._timings_font = pygame.font.Font(None, 16)
+        lines = [self._timings_font.render(line, True, (255, 255, 255), (0, 0, 0)) for line in text]
+        width = max((line.get_width() for line in lines), default=0)
+        surface = pygame.Surface((width, sum(line.get_height() for line in lines)))
+        y = 0
+        for line in lines:
+            surface.blit(line, (0, y))
+            y += line.get_height()
+        self.mark_dirty(self._timings_rect, surface.get_rect())
+        self._timings_surface = surface
+        self._timings_rect = surface.get_rect()
+
+    def draw_timings(self):
+        if self._timings_surface is not None:
+            self.screen.blit(self._timings_surface, (0, 0))
+
+    def mark_dirty(self, *rects: pygame.Rect):
+        """
+        Reports screen regions that changed since last frame, used only in dirty rects mode.
+        """
+        self._dirty.extend(pygame.Rect(r) for r in rects)
+
+    def mark_all_dirty(self):
+        self._full_redraw = True
+
+    def update_dirty(self):
+        """
+        To override.\n
+        Called before drawing in dirty rects mode, report changed regions with mark_dirty or mark_all_dirty.
+        :return: None
+        """
+        pass
+
+    def subscribe_keys(self, key_codes: Iterable[int]):
+        """
+        Polls only the given keys for on_key_pressed, until subscribe_keys is called the app polls every key.
+        """
+        self.polled_keys = tuple(sorted(set(self.polled_keys or ()) | set(key_codes)))
+
+    def unsubscribe_keys(self, key_codes: Iterable[int]):
+        self.polled_keys = tuple(sorted(set(self.polled_keys or ()) - set(key_codes)))
+
+    def register_event(self, event_type: int, handler: Callable[[pygame.event.Event], None]):
+        """
+        Routes events of event_type to handler instead of on_event.
+        """
+        self.event_handlers[event_type] = handler
+
+    def unregister_event(self, event_type: int):
+        self.event_handlers.pop(event_type, None)
 
     def handle_input(self):
+        keys = get_all_keycodes() if self.polled_keys is None else self.polled_keys
+        if not keys:
+            return
         keys_pressed = pygame.key.get_pressed()
-        for keycode in all_keycodes:
+        for keycode in keys:
             if keys_pressed[keycode]:
                 self.on_key_pressed(keycode)
         return
@@ -97,6 +306,8 @@ class BaseApp:
         pass
 
     def check_events(self):
+        if self.headless:
+            return
         # handle pressed input
         self.handle_input()
 
@@ -118,24 +329,19 @@ class BaseApp:
     def handle_event(self, event: pygame.event.Event):
         self.event_info = event
         self.event_info_actual = True
-        e = event.type
-        if e == pygame.QUIT:
-            self.on_exit()
-        elif e == pygame.KEYDOWN:
-            self.on_key_down(event.key)
-        elif e == pygame.KEYUP:
-            self.on_key_up(event.key)
-        elif e == pygame.MOUSEBUTTONDOWN:
-            self.on_mouse_button_down(pygame.mouse.get_pos(), event.button)
-        elif e == pygame.MOUSEBUTTONUP:
-            self.on_mouse_button_up(pygame.mouse.get_pos(), event.button)
-        elif e == pygame.MOUSEMOTION:
-            self.on_mouse_move(pygame.mouse.get_pos())
-        else:
-            self.on_event(event)
+        self.event_handlers.get(event.type, self.on_event)(event)
         self.event_info_actual = False
 
-    def game_loop(self, delta: int):
+    def _on_key_down_event(self, event: pygame.event.Event):
+        if event.key == self.timings_key:
+            self.show_timings = not self.show_timings
+        self.on_key_down(event.key)
+
+    def _on_expose(self, event: pygame.event.Event):
+        self.mark_all_dirty()
+        self.on_event(event)
+
+    def game_loop(self, delta: float):
         """
         To override.
         :return:
@@ -1,10 +1,11 @@
 from typing import Union, List, Tuple, Callable, Optional
 
 import pygame as p
-from pygame.font import FontType, get_default_font, SysFont
+from pygame.font import FontType, get_default_font
 from pygame.math import Vector2
 from pygame.sprite import Sprite
 
+from asserts.graphics.fonts import get_font, text_cache
 from asserts.graphics.graphics_manager import load_image
 
 COLOR = Union[p.Color, Tuple[int, int, int], Tuple[int, int, int, int]]
@@ -27,24 +28,18 @@ class Button:
         self.position = Vector2(position)
         if texts is not None:
             if texts_font is None:
-                texts_font = SysFont(get_default_font(), 20)
+                texts_font = get_font(get_default_font(), 20)
             if texts_color is None:
                 texts_color = p.color.Color(255, 255, 255)
-            for i in range(self.click_range.stop):
-                text_r = [texts_font.render(texts[i], True, texts_color),
-                          texts_font.render(texts[i], True, texts_color)]
-                size = [text_r[i].get_size(), text_r[i].get_size()]
-                self.display = [p.Surface(size[i]), p.Surface(size[i])]
-            if texts_bg_color is not None:
-                for i in range(self.click_range.stop):
-                    self.display[i].fill(texts_bg_color[i])
-            for i in range(self.click_range.stop):
-                # noinspection PyUnboundLocalVariable
-                self.display[i].blit(text_r[0], (0, 0))
+            self.display = []
             self.rect = []
             for i in range(self.click_range.stop):
-                # noinspection PyUnboundLocalVariable
-                self.rect.append(p.Rect(self.position.x, self.position.y, size[i][0], size[i][1]))
+                text_r = text_cache.render(texts[i], texts_font, texts_color)
+                self.display.append(p.Surface(text_r.get_size()))
+                if texts_bg_color is not None:
+                    self.display[i].fill(texts_bg_color[i])
+                self.display[i].blit(text_r, (0, 0))
+                self.rect.append(p.Rect(self.position.x, self.position.y, *text_r.get_size()))
         elif imgs is not None:
             if isinstance(imgs[0], str):
                 for i in range(self.click_range.stop):
@@ -0,0 +1,158 @@
+from typing import List, Sequence, Tuple, Union, Iterator, Dict
+
+import pygame as p
+
+import asserts.graphics.graphics_manager as graphics
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+EMPTY = 0
+WALL = 1
+SPIKE = 2
+WIN = 4
+
+TILE_SIZE = 32
+
+mapT = Sequence[Sequence[Union[int, float]]]
+
+
+def tile_class(name: str) -> int:
+    if name in graphics.WALLS:
+        return WALL
+    if name in graphics.SPIKES:
+        return SPIKE
+    if name == graphics.WIN:
+        return WIN
+    return EMPTY
+
+
+TILE_CLASSES = bytes(tile_class(name) for name in graphics.SPRITES)
+
+
+class TileGrid:
+    """
+    Uniform grid of tile class masks, one cell per map tile.\n
+    Cell (x, y) covers rect (x * tile_size, y * tile_size, tile_size, tile_size), the same place as the tile sprite
+    created by Level, so a query only looks at the cells under the queried rect, not at every tile of the map.
+    """
+
+    def __init__(self, width: int, height: int, tile_size: int = TILE_SIZE):
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.masks = bytearray(width * height)
+
+    @classmethod
+    def from_map(cls, map_: mapT, tile_size: int = TILE_SIZE) -> "TileGrid":
+        grid = cls(len(map_), max(map(len, map_), default=0), tile_size)
+        for x, row in enumerate(map_):
+            start = x * grid.height
+            grid.masks[start:start + len(row)] = bytes(TILE_CLASSES[int(e)] for e in row)
+        return grid
+
+    @classmethod
+    def from_masks(cls, width: int, height: int, masks: bytes, tile_size: int = TILE_SIZE) -> "TileGrid":
+        grid = cls(width, height, tile_size)
+        grid.masks[:] = masks
+        return grid
+
+    def get(self, x: int, y: int) -> int:
+        return self.masks[x * self.height + y]
+
+    def set(self, x: int, y: int, mask: int):
+        self.masks[x * self.height + y] = mask
+
+    def cells(self, rect: p.Rect) -> Iterator[Tuple[int, int]]:
+        if rect.width <= 0 or rect.height <= 0:
+            return
+        size = self.tile_size
+        x_range = range(max(rect.left // size, 0), min((rect.right - 1) // size + 1, self.width))
+        y_range = range(max(rect.top // size, 0), min((rect.bottom - 1) // size + 1, self.height))
+        for x in x_range:
+            for y in y_range:
+                yield x, y
+
+    def cell_rect(self, x: int, y: int) -> p.Rect:
+        return p.Rect(x * self.tile_size, y * self.tile_size, self.tile_size, self.tile_size)
+
+    def collide(self, rect: p.Rect, mask: int) -> bool:
+        return any(self.masks[x * self.height + y] & mask for x, y in self.cells(rect))
+
+    def collide_all(self, rect: p.Rect, mask: int) -> List[p.Rect]:
+        return [self.cell_rect(x, y) for x, y in self.cells(rect) if self.masks[x * self.height + y] & mask]
+
+    def probe(self, rect: p.Rect, offsets: Sequence[Tuple[int, int]], mask: int) -> Tuple[bool, ...]:
+        """
+        Tests rect moved by every offset in one call, each cell around rect is looked up only once.
+        """
+        hits = [rect.move(offset) for offset in offsets]
+        area = rect.unionall(hits)
+        solid = [self.cell_rect(x, y) for x, y in self.cells(area) if self.masks[x * self.height + y] & mask]
+        if not solid:
+            return (False,) * len(hits)
+        return tuple(h.collidelist(solid) != -1 for h in hits)
+
+    def hit_boxes(self, mask: int) -> List[p.Rect]:
+        height = self.height
+        return [self.cell_rect(i // height, i % height) for i, m in enumerate(self.masks) if m & mask]
+
+
+class BatchCollider:
+    """
+    Static hit boxes kept as one contiguous (N, 4) left, top, right, bottom array with a class mask per box.\n
+    collide tests a whole batch of moving boxes against every class in one vectorized call, falls back to
+    pygame.Rect lists if numpy is not installed.
+    """
+
+    def __init__(self, boxes: Sequence[p.Rect], masks: Sequence[int]):
+        self.rects = [p.Rect(b) for b in boxes]
+        self.masks = bytes(masks)
+        if np is not None:
+            self.edges = np.array([(r.left, r.top, r.right, r.bottom) for r in self.rects], dtype=np.int32) \
+                .reshape((-1, 4))
+            self.mask_array = np.frombuffer(self.masks, dtype=np.uint8)
+
+    @classmethod
+    def from_grid(cls, grid: TileGrid) -> "BatchCollider":
+        boxes = []
+        masks = []
+        for i, mask in enumerate(grid.masks):
+            if mask:
+                boxes.append(grid.cell_rect(i // grid.height, i % grid.height))
+                masks.append(mask)
+        return cls(boxes, masks)
+
+    def __len__(self):
+        return len(self.rects)
+
+    def collide(self, bodies: Sequence[p.Rect], mask: int) -> List[bool]:
+        return self.collide_classes(bodies, (mask,))[mask]
+
+    def collide_classes(self, bodies: Sequence[p.Rect], masks: Sequence[int] = (WALL, SPIKE, WIN)) \
+            -> Dict[int, List[bool]]:
+        """
+        :param bodies: moving hit boxes
+        :param masks: tile classes to test against
+        :return: for every class, whether each body touches a tile of that class
+        """
+        if np is None or not self.rects or not bodies:
+            return self._collide_classes_rects(bodies, masks)
+        moving = np.array([(b[0], b[1], b[0] + b[2], b[1] + b[3]) for b in bodies], dtype=np.int32)
+        s = self.edges
+        hits = (moving[:, 0, None] < s[None, :, 2]) & (moving[:, 2, None] > s[None, :, 0]) & \
+               (moving[:, 1, None] < s[None, :, 3]) & (moving[:, 3, None] > s[None, :, 1])
+        # zero sized bodies do not collide, same as pygame.Rect
+        hits &= ((moving[:, 2] > moving[:, 0]) & (moving[:, 3] > moving[:, 1]))[:, None]
+        return {mask: (hits & ((self.mask_array & mask) != 0)[None, :]).any(axis=1).tolist() for mask in masks}
+
+    def _collide_classes_rects(self, bodies: Sequence[p.Rect], masks: Sequence[int]) -> Dict[int, List[bool]]:
+        ret = {mask: [False] * len(bodies) for mask in masks}
+        for i, body in enumerate(bodies):
+            for j in p.Rect(body).collidelistall(self.rects):
+                for mask in masks:
+                    if self.masks[j] & mask:
+                        ret[mask][i] = True
+        return ret
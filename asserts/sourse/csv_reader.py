@@ -1,5 +1,5 @@
 import csv
-from typing import TextIO, Union, AnyStr as PathLike, Literal
+from typing import TextIO, Union, Optional, AnyStr as PathLike, Literal
 
 
 class CsvOpen:
@@ -8,23 +8,28 @@ class CsvOpen:
     def __init__(self, file: Union[TextIO, PathLike], mode: modes):
         self.__mode = mode
         self.file = file
+        self.__opened: Optional[TextIO] = None
+
+    def __open(self, mode: str) -> TextIO:
+        self.__opened = open(self.file, mode=mode, newline="")
+        return self.__opened
 
     def __enter__(self):
         if self.__mode == "r":
             if type(self.file) == TextIO:
                 return csv.reader(self.file)
             else:
-                return csv.reader(open(self.file, mode="r"))
+                return csv.reader(self.__open("r"))
         elif self.__mode == "w":
             if type(self.file) == TextIO:
                 return csv.writer(self.file)
             else:
-                return csv.writer(open(self.file, mode="w"))
+                return csv.writer(self.__open("w"))
         elif self.__mode == "w+":
             if type(self.file) == TextIO:
                 return csv.writer(self.file)
             else:
-                return csv.writer(open(self.file, mode="a"))
+                return csv.writer(self.__open("a"))
         else:
             msg = f"Invalid mode {self.__mode}," \
                   " it can be r - read," \
@@ -33,4 +38,6 @@ class CsvOpen:
             raise ValueError(msg)
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        pass
+        if self.__opened is not None:
+            self.__opened.close()
+            self.__opened = None
@@ -0,0 +1,128 @@
+from array import array
+from typing import Iterator, List, Tuple, Union, Sequence
+
+import pygame as p
+from pygame.math import Vector2
+
+from asserts.sourse.history import MoveHistory
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class GhostManager:
+    """
+    Timelines of every killed player (memory) in one structure of arrays.\n
+    All timelines are decoded once into a single flat array of x, y shorts, every ghost is an offset into it plus its
+    replay time and the index it stops at, so one tick advances every ghost at once (vectorized when numpy is
+    installed) and drawing is one Surface.blits call.
+    """
+
+    def __init__(self):
+        self.timeline = array("h")
+        self.offsets = array("q")
+        self.stops = array("q")
+        self.times = array("q")
+        self._views = None
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __iter__(self) -> Iterator[Vector2]:
+        return iter(self.positions())
+
+    def _release_views(self):
+        # arrays can not grow while numpy views export their buffers
+        self._views = None
+
+    def _get_views(self):
+        if self._views is None:
+            self._views = (np.frombuffer(self.timeline, dtype=np.int16).reshape((-1, 2)),
+                           np.frombuffer(self.offsets, dtype=np.int64),
+                           np.frombuffer(self.stops, dtype=np.int64),
+                           np.frombuffer(self.times, dtype=np.int64))
+        return self._views
+
+    def add(self, history: MoveHistory, end_pos: Union[Vector2, Sequence[float]]):
+        """
+        :param history: steps to replay, must not be empty
+        :param end_pos: where the ghost stops, the first time it gets there
+        """
+        self._release_views()
+        end = (int(end_pos[0]), int(end_pos[1]))
+        start = len(self.timeline) // 2
+        stop = -1
+        for i, pos in enumerate(history):
+            x, y = int(pos[0]), int(pos[1])
+            self.timeline.append(x)
+            self.timeline.append(y)
+            if stop < 0 and (x, y) == end:
+                stop = i
+        if stop < 0:
+            stop = len(history) - 1
+        self.offsets.append(start)
+        self.stops.append(stop)
+        self.times.append(0)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.itemsize * len(a) for a in (self.timeline, self.offsets, self.stops, self.times))
+
+    def clear(self):
+        self._release_views()
+        del self.timeline[:]
+        del self.offsets[:]
+        del self.stops[:]
+        del self.times[:]
+
+    def loop(self):
+        if not len(self):
+            return
+        if np is not None:
+            times = self._get_views()[3]
+            times += 1
+            return
+        for i in range(len(self.times)):
+            self.times[i] += 1
+
+    def respawn(self):
+        if np is not None and len(self):
+            self._get_views()[3][:] = 0
+            return
+        for i in range(len(self.times)):
+            self.times[i] = 0
+
+    def _indexes(self):
+        if np is not None:
+            _, offsets, stops, times = self._get_views()
+            return offsets + np.minimum(times, stops)
+        return [o + min(t, s) for o, t, s in zip(self.offsets, self.times, self.stops)]
+
+    def positions(self) -> List[Vector2]:
+        return [Vector2(x, y) for x, y in self.cords()]
+
+    def cords(self) -> List[Tuple[int, int]]:
+        if not len(self):
+            return []
+        if np is not None:
+            return [tuple(e) for e in self._get_views()[0][self._indexes()].tolist()]
+        return [(self.timeline[2 * i], self.timeline[2 * i + 1]) for i in self._indexes()]
+
+    def screen_cords(self, offset: Union[Vector2, Tuple[float, float]] = (0, 0), tile_size: int = 32) \
+            -> List[Tuple[int, int]]:
+        """
+        Same layout as Player.draw, map x is the screen row.
+        """
+        if not len(self):
+            return []
+        if np is not None:
+            cords = self._get_views()[0][self._indexes()].astype(np.int32)
+            screen = cords[:, ::-1] * tile_size + np.array((int(offset[0]), int(offset[1])), dtype=np.int32)
+            return [tuple(e) for e in screen.tolist()]
+        return [(y * tile_size + int(offset[0]), x * tile_size + int(offset[1])) for x, y in self.cords()]
+
+    def draw(self, screen: p.Surface, image: p.Surface, offset: Union[Vector2, Tuple[float, float]] = (0, 0)):
+        if len(self):
+            screen.blits([(image, cords) for cords in self.screen_cords(offset)], False)
@@ -0,0 +1,133 @@
+from array import array
+from typing import Dict, Iterator, Optional, Sequence, Tuple, Union
+
+from pygame.math import Vector2
+
+posT = Union[Vector2, Sequence[float]]
+
+# delta mode: x of a step too big for a signed byte, the step itself is kept aside
+ESCAPE = -128
+
+
+class MoveHistory:
+    """
+    Compact store of tile positions, two signed shorts per step, or two signed bytes per step with delta encoding.\n
+    With cap > 0 it is a ring buffer keeping only the last cap steps, index 0 is always the oldest kept step.
+    Delta encoding fits steps of at most 127 tiles per axis in the bytes, bigger ones (respawns, level changes) are
+    stored as an ESCAPE entry and kept in a dict by step number.
+    """
+
+    def __init__(self, cap: int = 0, delta: bool = False):
+        self.cap = cap
+        self.delta = delta
+        self._data = array("b" if delta else "h")
+        if cap > 0:
+            self._data.extend(bytes(2 * cap * self._data.itemsize))
+        self._start = 0
+        self._len = 0
+        # delta mode: absolute position of the oldest and the newest step
+        self._base = (0, 0)
+        self._last = (0, 0)
+        self._cursor = (0, (0, 0))
+        # delta mode: steps appended so far and the big steps by their number
+        self._count = 0
+        self._jumps: Dict[int, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return self._len
+
+    @property
+    def nbytes(self) -> int:
+        return self._len * 2 * self._data.itemsize + len(self._jumps) * 16
+
+    def _slot(self, i: int) -> int:
+        return 2 * ((self._start + i) % self.cap if self.cap > 0 else i)
+
+    def _write(self, x: int, y: int):
+        if self.cap <= 0:
+            self._data.append(x)
+            self._data.append(y)
+            self._len += 1
+            return
+        if self._len < self.cap:
+            s = self._slot(self._len)
+            self._len += 1
+        else:
+            if self.delta and self._len > 1:
+                self._evict_oldest()
+            s = 2 * self._start
+            self._start = (self._start + 1) % self.cap
+        self._data[s] = x
+        self._data[s + 1] = y
+
+    def _delta(self, i: int) -> Tuple[int, int]:
+        s = self._slot(i)
+        if self._data[s] == ESCAPE:
+            return self._jumps[self._count - self._len + i]
+        return self._data[s], self._data[s + 1]
+
+    def _evict_oldest(self):
+        # the second oldest step becomes the base, its delta is folded into it
+        dx, dy = self._delta(1)
+        self._base = (self._base[0] + dx, self._base[1] + dy)
+        self._jumps.pop(self._count - self._len, None)
+        i, pos = self._cursor
+        self._cursor = (i - 1, pos) if i > 0 else (0, self._base)
+
+    def append(self, pos: posT):
+        x, y = int(pos[0]), int(pos[1])
+        if not self.delta:
+            self._write(x, y)
+            return
+        dx, dy = x - self._last[0], y - self._last[1]
+        if self._len == 0 or self.cap == 1:
+            # the only step is the base
+            self._base = (x, y)
+            self._cursor = (0, self._base)
+            dx = dy = 0
+        elif not (-127 <= dx <= 127 and -127 <= dy <= 127):
+            self._jumps[self._count] = (dx, dy)
+            dx, dy = ESCAPE, 0
+        self._write(dx, dy)
+        self._count += 1
+        self._last = (x, y)
+
+    def _get(self, i: int) -> Tuple[int, int]:
+        if not self.delta:
+            s = self._slot(i)
+            return self._data[s], self._data[s + 1]
+        c, (x, y) = self._cursor
+        if c > i:
+            c, x, y = 0, self._base[0], self._base[1]
+        while c < i:
+            c += 1
+            dx, dy = self._delta(c)
+            x += dx
+            y += dy
+        self._cursor = (c, (x, y))
+        return x, y
+
+    def __getitem__(self, i: int) -> Vector2:
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError("history index out of range")
+        return Vector2(self._get(i))
+
+    def __iter__(self) -> Iterator[Vector2]:
+        for i in range(self._len):
+            yield Vector2(self._get(i))
+
+    @property
+    def last(self) -> Optional[Vector2]:
+        return self[-1] if self._len else None
+
+    def snapshot(self) -> "MoveHistory":
+        """
+        Independent copy, later appends to this history do not change it.
+        """
+        copy = MoveHistory.__new__(MoveHistory)
+        copy.__dict__.update(self.__dict__)
+        copy._data = array(self._data.typecode, self._data)
+        copy._jumps = dict(self._jumps)
+        return copy
@@ -0,0 +1,122 @@
+import csv
+import json
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from typing import Deque, Dict, Iterator, List, Optional, Sequence, TextIO, ContextManager
+
+PERCENTILES = (50, 95, 99)
+
+
+class FrameTimer:
+    """
+    Keeps the last `size` durations (ms) of every named frame phase in a ring buffer.
+    """
+
+    def __init__(self, size: int = 240, enabled: bool = True):
+        self.size = size
+        self.enabled = enabled
+        self.samples: Dict[str, Deque[float]] = {}
+
+    def phase(self, name: str) -> ContextManager:
+        if not self.enabled:
+            return nullcontext()
+        return self._phase(name)
+
+    @contextmanager
+    def _phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000)
+
+    def add(self, name: str, ms: float):
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = deque(maxlen=self.size)
+        samples.append(ms)
+
+    def percentiles(self, name: str, percentiles: Sequence[int] = PERCENTILES) -> List[float]:
+        samples = sorted(self.samples.get(name, ()))
+        if not samples:
+            return [0.0] * len(percentiles)
+        return [samples[min(len(samples) - 1, len(samples) * q // 100)] for q in percentiles]
+
+    def summary(self, percentiles: Sequence[int] = PERCENTILES) -> Dict[str, Dict[str, float]]:
+        return {name: dict(zip((f"p{q}" for q in percentiles), self.percentiles(name, percentiles)))
+                for name in self.samples}
+
+    def lines(self) -> List[str]:
+        return [f"{name}: " + " ".join(f"{k} {v:.2f}" for k, v in values.items())
+                for name, values in self.summary().items()]
+
+    def export_json(self, path: str):
+        with open(path, "w") as file:
+            json.dump({"summary": self.summary(), "samples": {k: list(v) for k, v in self.samples.items()}}, file,
+                      indent=4)
+
+    def export_csv(self, path: str):
+        """
+        One row per frame, one column per phase.
+        """
+        names = list(self.samples)
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(names)
+            columns = [list(self.samples[name]) for name in names]
+            for i in range(max(map(len, columns), default=0)):
+                writer.writerow([f"{c[i]:.4f}" if i < len(c) else "" for c in columns])
+
+    def export(self, path: str):
+        if path.endswith(".csv"):
+            self.export_csv(path)
+        else:
+            self.export_json(path)
+
+
+class DebugSink:
+    """
+    Sampled debug output, only every `sample_every`th message is kept and written by a background thread.\n
+    Messages are dropped instead of waiting when the writer falls behind, so logging never blocks a frame.
+    """
+
+    def __init__(self, sample_every: int = 1, stream: Optional[TextIO] = None, max_pending: int = 256):
+        self.sample_every = max(sample_every, 1)
+        self.stream = stream
+        self.dropped = 0
+        self._count = 0
+        self._queue: "queue.Queue[str]" = queue.Queue(max_pending)
+        self._thread: Optional[threading.Thread] = None
+
+    def sample(self) -> bool:
+        """
+        Call once per message, tells whether this one should be built and written.
+        """
+        self._count += 1
+        return self._count % self.sample_every == 0
+
+    def write(self, *args):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="debug sink", daemon=True)
+            self._thread.start()
+        try:
+            self._queue.put_nowait(" ".join(map(str, args)))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            message = self._queue.get()
+            stream = self.stream or sys.stdout
+            stream.write(message + "\n")
+            if self._queue.empty():
+                stream.flush()
+
+    def flush(self, timeout: float = 1.0):
+        end = time.monotonic() + timeout
+        while not self._queue.empty() and time.monotonic() < end:
+            time.sleep(0.001)
@@ -0,0 +1,180 @@
+"""
+Per level records (best time in ticks, wins and deaths) kept in memory and saved by a background thread.
+
+On disk there is a snapshot (records.json, replaced atomically) and a journal next to it (records.json.journal, one json
+line per update appended since the snapshot). Updates only go to the journal, which is folded into a new snapshot
+every compact_every updates and on close. Every update has a sequence number and the snapshot stores the last one it
+contains, so a crash between writing the snapshot and emptying the journal does not count anything twice.
+"""
+import json
+import os
+import sys
+import threading
+from typing import Dict, List, Optional, Any
+
+recordT = Dict[str, Any]
+
+# seconds the writer waits before trying a failed write again
+RETRY_DELAY = 1.0
+
+
+def empty_record() -> recordT:
+    return {"best_time": None, "wins": 0, "deaths": 0}
+
+
+class RecordsStore:
+    def __init__(self, path: Optional[str] = None, compact_every: int = 256):
+        """
+        :param path: snapshot file, None keeps the records in memory only
+        """
+        self.path = path
+        self.journal_path = path + ".journal" if path else None
+        self.compact_every = compact_every
+        self.levels: Dict[int, recordT] = {}
+        self.seq = 0
+        self._saved_seq = 0
+        self._written_seq = 0
+        self._pending: List[Dict[str, int]] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closing = False
+        # the last write error, None once a write succeeds again
+        self.error: Optional[OSError] = None
+        self._failures = 0
+        if path:
+            self.load()
+
+    def get(self, level: int) -> recordT:
+        return self.levels.get(level) or empty_record()
+
+    def load(self):
+        self.levels.clear()
+        self.seq = 0
+        if os.path.exists(self.path):
+            with open(self.path) as file:
+                data = json.load(file)
+            self.seq = data.pop("seq", 0)
+            for level, record in data.items():
+                self.levels[int(level)] = {**empty_record(), **record}
+        self._saved_seq = self.seq
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path) as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # the last line of a crashed write
+                        break
+                    if entry["seq"] > self.seq:
+                        self._apply(entry)
+        self._written_seq = self.seq
+
+    def _apply(self, entry: Dict[str, int]):
+        self.seq = entry["seq"]
+        record = self.levels.setdefault(entry["level"], empty_record())
+        if "win" in entry:
+            record["wins"] += 1
+            if record["best_time"] is None or entry["win"] < record["best_time"]:
+                record["best_time"] = entry["win"]
+        else:
+            record["deaths"] += entry.get("deaths", 0)
+
+    def _update(self, entry: Dict[str, int]):
+        with self._cond:
+            entry["seq"] = self.seq + 1
+            self._apply(entry)
+            if self.path is None:
+                return
+            self._pending.append(entry)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="records writer", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def add_win(self, level: int, ticks: int):
+        self._update({"level": level, "win": ticks})
+
+    def add_death(self, level: int):
+        self._update({"level": level, "deaths": 1})
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closing:
+                    self._cond.wait()
+                # everything queued since the last wake up is written at once
+                entries, self._pending = self._pending, []
+                closing = self._closing
+                snapshot = None
+                if closing or self.seq - self._saved_seq >= self.compact_every:
+                    snapshot = {"seq": self.seq, **{str(k): dict(v) for k, v in sorted(self.levels.items())}}
+            try:
+                if entries:
+                    self._append_journal(entries)
+                    with self._cond:
+                        self._written_seq = entries[-1]["seq"]
+                        self.error = None
+                        self._cond.notify_all()
+                if snapshot is not None and snapshot["seq"] != self._saved_seq:
+                    self._write_snapshot(snapshot)
+                    self._saved_seq = snapshot["seq"]
+            except OSError as e:
+                print(f"records: could not save to {self.path}: {e}", file=sys.stderr)
+                with self._cond:
+                    self.error = e
+                    self._failures += 1
+                    self._cond.notify_all()
+                    if entries and self._written_seq < entries[-1]["seq"]:
+                        # not in the journal, keep them for the next try
+                        self._pending[:0] = entries
+                    if not closing:
+                        self._cond.wait(RETRY_DELAY)
+            if closing:
+                return
+
+    def _append_journal(self, entries: List[Dict[str, int]]):
+        with open(self.journal_path, "a") as file:
+            file.write("".join(json.dumps(entry) + "\n" for entry in entries))
+            file.flush()
+            os.fsync(file.fileno())
+
+    def _write_snapshot(self, snapshot: Dict[str, Any]):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as file:
+            json.dump(snapshot, file, indent=2)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp, self.path)
+        # only this thread appends, everything in the journal is in the snapshot now
+        open(self.journal_path, "w").close()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until every update is in the journal or the next write fails.\n
+        :return: every update is in the journal
+        """
+        with self._cond:
+            if self._thread is None:
+                return self._written_seq >= self.seq
+            failures = self._failures
+            self._cond.wait_for(lambda: self._written_seq >= self.seq or self._failures != failures, timeout)
+            return self._written_seq >= self.seq
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """
+        Writes what is left and a final snapshot, then stops the writer thread.\n
+        :return: the writer thread stopped, False if it is still writing after timeout
+        """
+        with self._cond:
+            thread = self._thread
+            if thread is None:
+                return True
+            self._closing = True
+            self._cond.notify_all()
+        thread.join(timeout)
+        if thread.is_alive():
+            return False
+        with self._cond:
+            self._thread = None
+            self._closing = False
+        return True
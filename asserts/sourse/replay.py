@@ -0,0 +1,146 @@
+"""
+Input recordings, every key press and click with the simulation tick it happened before.
+
+Layout (little endian)::
+
+    header      magic b"RPL1", version, ticks per second, checksum every (0 when not recorded)
+    records     (tick, kind, a, b) uint32, uint8, uint32, uint32 until the end of the file
+                KEY a = key code, CLICK a = x << 16 | y and b = button, CHECKSUM a = App.state_checksum(),
+                END marks the tick count of the whole session
+"""
+import struct
+import zlib
+from typing import BinaryIO, Iterator, List, NamedTuple, Optional, Tuple
+
+MAGIC = b"RPL1"
+VERSION = 1
+HEADER = struct.Struct("<4sHHI")
+RECORD = struct.Struct("<IBII")
+EXTENSION = ".rpl"
+
+KEY = 0
+CLICK = 1
+CHECKSUM = 2
+END = 3
+
+
+class Record(NamedTuple):
+    tick: int
+    kind: int
+    a: int
+    b: int
+
+
+class ReplayMismatch(ValueError):
+    def __init__(self, tick: int, expected: int, got: int):
+        super().__init__(f"state checksum differs at tick {tick}: recorded {expected:08x}, replayed {got:08x}")
+        self.tick = tick
+        self.expected = expected
+        self.got = got
+
+
+def checksum(*values: int) -> int:
+    return zlib.crc32(struct.pack(f"<{len(values)}i", *values))
+
+
+class Recorder:
+    """
+    Writes inputs as they reach the app, the file is complete after close().\n
+    :param checksum_every: also store the app state checksum every n ticks, 0 to skip it
+    :param start: app tick the recording starts at, ticks are stored counting from it like replay runs them
+    """
+
+    def __init__(self, path: str, tps: int, checksum_every: int = 0, start: int = 0):
+        self.path = path
+        self.checksum_every = checksum_every
+        self.start = start
+        self.file: Optional[BinaryIO] = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, tps, checksum_every))
+
+    def write(self, tick: int, kind: int, a: int = 0, b: int = 0):
+        if self.file is not None:
+            self.file.write(RECORD.pack(tick - self.start, kind, a, b))
+
+    def key(self, tick: int, key_code: int):
+        self.write(tick, KEY, key_code)
+
+    def click(self, tick: int, pos: Tuple[int, int], button_id: int):
+        self.write(tick, CLICK, int(pos[0]) << 16 | int(pos[1]), button_id)
+
+    def wants_checksum(self, tick: int) -> bool:
+        return self.checksum_every > 0 and (tick - self.start) % self.checksum_every == 0
+
+    def checksum(self, tick: int, state: int):
+        """
+        State after simulation tick number `tick` is done.
+        """
+        self.write(tick, CHECKSUM, state)
+
+    def close(self, ticks: int):
+        if self.file is not None:
+            self.write(ticks, END)
+            self.file.close()
+            self.file = None
+
+
+class Recording:
+    def __init__(self, tps: int, checksum_every: int, records: List[Record]):
+        self.tps = tps
+        self.checksum_every = checksum_every
+        self.records = records
+
+    @classmethod
+    def load(cls, path: str) -> "Recording":
+        with open(path, "rb") as file:
+            data = file.read()
+        magic, version, tps, checksum_every = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"not an input recording (version {VERSION})")
+        size = (len(data) - HEADER.size) // RECORD.size * RECORD.size
+        records = [Record(*r) for r in RECORD.iter_unpack(data[HEADER.size:HEADER.size + size])]
+        return cls(tps, checksum_every, records)
+
+    @property
+    def ticks(self) -> int:
+        """
+        Length of the session, without an END record (the game was killed) the last recorded tick.
+        """
+        for record in reversed(self.records):
+            if record.kind == END:
+                return record.tick
+        return self.records[-1].tick + 1 if self.records else 0
+
+    def __iter__(self) -> Iterator[Record]:
+        return iter(self.records)
+
+
+def replay(app, recording: Recording, verify: bool = True) -> int:
+    """
+    Feeds the recording through the app input handlers and runs every tick as fast as possible.\n
+    :param app: App at the state the recording started from
+    :param verify: compare recorded state checksums, raises ReplayMismatch on the first difference
+    :return: number of ticks run
+    """
+    delta = 1 / recording.tps
+    records = recording.records
+    i = 0
+    ticks = recording.ticks
+    for tick in range(ticks):
+        while i < len(records) and records[i].kind in (KEY, CLICK) and records[i].tick <= tick:
+            record = records[i]
+            if record.kind == KEY:
+                app.on_key_down(record.a)
+            else:
+                app.on_mouse_button_down((record.a >> 16, record.a & 0xFFFF), record.b)
+            i += 1
+        app.game_loop(delta)
+        while i < len(records) and records[i].kind in (CHECKSUM, END) and records[i].tick <= tick + 1:
+            record = records[i]
+            if record.kind == CHECKSUM and verify:
+                state = app.state_checksum()
+                if state != record.a:
+                    raise ReplayMismatch(record.tick, record.a, state)
+            i += 1
+        if not app.running:
+            return tick + 1
+    return ticks
@@ -13,3 +13,34 @@ PLAYER_ON_GROUND_FRICTION: Final = 0.6
 PLAYER_MOVE_CHECK_RANGE: Final = 5
 PLAYER_ANIMATION_TICKS: Final = 10
 PLAYER_SIZE: Final = (32, 32)
+SURFACE_CACHE_MAX_BYTES: Final = 16 * 1024 * 1024
+USE_SPRITE_ATLAS: Final = True
+TILE_ANIMATION_STEPS: Final = 0
+DIRTY_RECTS: Final = False
+# from benchmarks.collisions on level sized maps (the batch grows with the static boxes, on 64x64 maps the grid lookups
+# are as fast at any body count)
+BATCH_COLLISION_MIN_BODIES: Final = 5
+MAX_TPS: Final = 20
+MAX_CATCH_UP_STEPS: Final = 5
+PLAYER_HISTORY_CAP: Final = 4096
+PLAYER_HISTORY_DELTA: Final = True
+GHOST_ALPHA: Final = 120
+PREFETCH_LEVELS: Final = True
+CHUNK_SIZE: Final = 8
+CHUNK_LOAD_MARGIN: Final = 1
+CHUNK_EVICT_MARGIN: Final = 2
+DEBUG_SAMPLE_EVERY: Final = 20
+REPLAY_CHECKSUM_EVERY: Final = 1
+MIXER_CHANNELS: Final = 8
+MIXER_RESERVED_CHANNELS: Final = 0
+DEFAULT_MUSIC: Final = "bgm.wav"
+# level: music file in asserts/sounds, levels not listed play DEFAULT_MUSIC
+LEVEL_MUSIC: Final = {}
+MUSIC_FADE_MS: Final = 1000
+MUSIC_PREFETCH_BYTES: Final = 64 * 1024
+TEXT_CACHE_MAX_ENTRIES: Final = 256
+RECORDS_PATH: Final = "user-data/records.json"
+RECORDS_COMPACT_EVERY: Final = 256
+LEVEL_CACHE_MAX_BYTES: Final = 8 * 1024 * 1024
+# derive wall and spike variants from the tile classes instead of the csv ids when compiling levels
+AUTO_TILE_LEVELS: Final = False
@@ -0,0 +1,6 @@
+"""
+Imported first by main.py, so --startup-profile can count the time spent importing the rest of the game.
+"""
+import time
+
+STARTED = time.perf_counter()
@@ -0,0 +1,51 @@
+from unittest import TestCase
+
+import pygame as p
+
+from asserts.sourse.collisions import TileGrid, BatchCollider, WALL, SPIKE, WIN, EMPTY
+
+MAP = [
+    [0, 0, 0, 13],
+    [0, 1, 0, 0],
+    [10, 10, 21, 10],
+]
+
+
+class TestTileGrid(TestCase):
+    def setUp(self):
+        self.grid = TileGrid.from_map(MAP)
+
+    def test_from_map(self):
+        self.assertEqual(self.grid.get(0, 3), WALL)
+        self.assertEqual(self.grid.get(1, 1), SPIKE)
+        self.assertEqual(self.grid.get(2, 2), WIN)
+        self.assertEqual(self.grid.get(0, 0), EMPTY)
+
+    def test_collide_matches_rect_lists(self):
+        for mask in (WALL, SPIKE, WIN):
+            boxes = self.grid.hit_boxes(mask)
+            for x in range(-40, 140, 7):
+                for y in range(-40, 140, 7):
+                    rect = p.Rect(x, y, 32, 32)
+                    self.assertEqual(self.grid.collide(rect, mask), rect.collidelist(boxes) != -1, (mask, rect))
+                    self.assertEqual(sorted(map(tuple, self.grid.collide_all(rect, mask))),
+                                     sorted(tuple(boxes[i]) for i in rect.collidelistall(boxes)))
+
+    def test_probe(self):
+        offsets = ((0, 0), (-5, 0), (5, 0), (0, 5), (0, -5))
+        for x in range(-40, 140, 9):
+            for y in range(-40, 140, 9):
+                rect = p.Rect(x, y, 32, 32)
+                expected = tuple(self.grid.collide(rect.move(o), WALL) for o in offsets)
+                self.assertEqual(self.grid.probe(rect, offsets, WALL), expected)
+
+
+class TestBatchCollider(TestCase):
+    def test_collide_classes_matches_grid(self):
+        grid = TileGrid.from_map(MAP)
+        collider = BatchCollider.from_grid(grid)
+        bodies = [p.Rect(x, y, 32, 32) for x in range(-40, 140, 11) for y in range(-40, 140, 11)]
+        hits = collider.collide_classes(bodies)
+        self.assertEqual(hits, collider._collide_classes_rects(bodies, (WALL, SPIKE, WIN)))
+        for mask in (WALL, SPIKE, WIN):
+            self.assertEqual(hits[mask], [grid.collide(b, mask) for b in bodies])
@@ -0,0 +1,58 @@
+import random
+from unittest import TestCase
+
+from asserts.sourse.history import MoveHistory
+
+
+class TestMoveHistory(TestCase):
+    def walk(self, steps: int):
+        rng = random.Random(steps)
+        x, y = 4, 2
+        ret = [(x, y)]
+        for _ in range(steps):
+            x += rng.choice((-1, 0, 1))
+            y += rng.choice((-1, 0, 1))
+            ret.append((x, y))
+        return ret
+
+    def test_matches_list(self):
+        for cap in (0, 1, 2, 7, 50):
+            for delta in (False, True):
+                positions = self.walk(30)
+                # respawns and level changes jump further than a byte
+                positions[10:] = [(x + 300, y - 200) for x, y in positions[10:]]
+                positions[25:] = [(x - 1000, y) for x, y in positions[25:]]
+                history = MoveHistory(cap, delta)
+                for pos in positions:
+                    history.append(pos)
+                expected = positions[-cap:] if cap else positions
+                self.assertEqual([tuple(v) for v in history], expected, (cap, delta))
+                self.assertEqual(tuple(history[-1]), positions[-1])
+                # random access after sequential access
+                for i in (len(expected) - 1, 0, len(expected) // 2):
+                    self.assertEqual(tuple(history[i]), expected[i])
+
+    def test_snapshot_is_independent(self):
+        history = MoveHistory(5, True)
+        for pos in self.walk(8):
+            history.append(pos)
+        snapshot = history.snapshot()
+        before = [tuple(v) for v in snapshot]
+        history.append((100, 100))
+        self.assertEqual([tuple(v) for v in snapshot], before)
+        self.assertNotEqual([tuple(v) for v in history], before)
+
+    def test_nbytes(self):
+        history = MoveHistory(delta=True)
+        for pos in self.walk(10):
+            history.append(pos)
+        self.assertEqual(history.nbytes, 22)
+        with self.assertRaises(IndexError):
+            _ = history[11]
+
+    def test_jumps_are_dropped_with_their_steps(self):
+        history = MoveHistory(3, True)
+        for i in range(20):
+            history.append((i * 200, 0))
+        self.assertEqual([tuple(v) for v in history], [(3400, 0), (3600, 0), (3800, 0)])
+        self.assertLessEqual(len(history._jumps), 3)
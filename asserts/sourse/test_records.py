@@ -0,0 +1,66 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from asserts.sourse.records import RecordsStore
+
+
+class TestRecordsStore(TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        # cleanups run last in first out, stores closed in a test are gone before the directory
+        self.addCleanup(self.dir.cleanup)
+        self.path = os.path.join(self.dir.name, "records.json")
+        with open(self.path, "w") as file:
+            json.dump({"1": {}, "2": {}}, file)
+
+    def play(self, store: RecordsStore):
+        for ticks in (50, 30, 40):
+            store.add_death(1)
+            store.add_win(1, ticks)
+        store.add_death(2)
+
+    def test_close_writes_snapshot(self):
+        store = RecordsStore(self.path)
+        self.play(store)
+        store.close()
+        self.assertEqual(os.path.getsize(store.journal_path), 0)
+        loaded = RecordsStore(self.path)
+        self.assertEqual(loaded.get(1), {"best_time": 30, "wins": 3, "deaths": 3})
+        self.assertEqual(loaded.get(2), {"best_time": None, "wins": 0, "deaths": 1})
+        self.assertEqual(loaded.seq, 7)
+
+    def test_journal_after_crash(self):
+        store = RecordsStore(self.path, compact_every=3)
+        self.addCleanup(store.close)
+        self.play(store)
+        store.add_death(2)
+        # the store is only closed after the test, as if the game was killed
+        self.assertTrue(store.flush(1))
+        with open(store.journal_path, "a") as file:
+            file.write('{"seq": 9, "lev')
+        loaded = RecordsStore(self.path)
+        self.assertEqual(loaded.get(1), store.get(1))
+        self.assertEqual(loaded.get(2), store.get(2))
+
+    def test_snapshot_before_journal_truncate(self):
+        store = RecordsStore(self.path)
+        self.play(store)
+        store.close()
+        # crash after replacing the snapshot, before emptying the journal
+        with open(store.journal_path, "w") as file:
+            file.write(json.dumps({"seq": 7, "level": 2, "deaths": 1}) + "\n")
+        self.assertEqual(RecordsStore(self.path).get(2)["deaths"], 1)
+
+    def test_write_error(self):
+        store = RecordsStore(self.path)
+        self.addCleanup(store.close)
+        os.mkdir(store.journal_path)
+        store.add_death(1)
+        self.assertFalse(store.flush(5))
+        self.assertIsInstance(store.error, OSError)
+        self.assertTrue(store._thread.is_alive())
+        os.rmdir(store.journal_path)
+        self.assertTrue(store.flush(5))
+        self.assertIsNone(store.error)
@@ -0,0 +1,64 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import pygame as p
+
+import asserts.sourse.app as app
+import asserts.sourse.settings as settings
+from asserts.sourse.replay import Recording, ReplayMismatch, replay, KEY, CHECKSUM
+
+KEYS = [p.K_d, p.K_d, p.K_SPACE, p.K_SPACE, p.K_a, p.K_x, p.K_d, p.K_d, p.K_d]
+
+
+class TestReplay(TestCase):
+    def setUp(self):
+        p.font.init()
+        fd, self.path = tempfile.mkstemp(".rpl")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def new_app(self) -> app.App:
+        game = app.App(height=settings.HEIGHT, width=settings.WIDTH, headless=True)
+        game.prefetcher.wait()
+        return game
+
+    def record(self, warm_up: int = 0) -> int:
+        game = self.new_app()
+        game.simulate(warm_up)
+        game.start_recording(self.path)
+        for key in KEYS:
+            game.on_key_down(key)
+            game.simulate(3)
+        game.stop_recording()
+        return game.state_checksum()
+
+    def test_round_trip(self):
+        state = self.record()
+        recording = Recording.load(self.path)
+        self.assertEqual(recording.ticks, 3 * len(KEYS))
+        self.assertEqual([r.a for r in recording if r.kind == KEY], KEYS)
+        self.assertEqual(sum(r.kind == CHECKSUM for r in recording), 3 * len(KEYS))
+        game = self.new_app()
+        self.assertEqual(replay(game, recording), 3 * len(KEYS))
+        self.assertEqual(game.state_checksum(), state)
+
+    def test_mismatch(self):
+        self.record()
+        recording = Recording.load(self.path)
+        recording.records = [r._replace(a=p.K_a) if r.kind == KEY and r.a == p.K_d else r for r in recording]
+        with self.assertRaises(ReplayMismatch) as context:
+            replay(self.new_app(), recording)
+        self.assertEqual(context.exception.tick, 1)
+
+    def test_started_late(self):
+        state = self.record(warm_up=7)
+        recording = Recording.load(self.path)
+        self.assertEqual(recording.ticks, 3 * len(KEYS))
+        self.assertEqual(recording.records[0].tick, 0)
+        game = self.new_app()
+        game.simulate(7)
+        self.assertEqual(replay(game, recording), 3 * len(KEYS))
+        self.assertEqual(game.state_checksum(), state)
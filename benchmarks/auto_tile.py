@@ -0,0 +1,55 @@
+"""
+Times auto tiling and compiling a generated map, the vectorized pass against the per cell fallback, and single cell
+updates, run from the project directory:\n
+python -m benchmarks.auto_tile
+"""
+import argparse
+import random
+import timeit
+
+import asserts.maps.auto_tile as auto_tile
+from asserts.maps.level_compiler import compile_grid
+from asserts.sourse.collisions import EMPTY, WALL, SPIKE, WIN
+
+
+def generate(rng: random.Random, size: int):
+    return [[rng.choices((EMPTY, WALL, SPIKE), (60, 35, 5))[0] for _ in range(size)] for _ in range(size)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="auto tiling benchmark")
+    parser.add_argument("-s", "--size", type=int, default=1000, help="map rows and columns, at most 1024")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="runs per case, the best one counts")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    classes = generate(rng, args.size)
+    classes[0][0] = WIN
+    print(f"{args.size}x{args.size} map, numpy: {auto_tile.np is not None}")
+
+    def best(function, number=1) -> float:
+        return min(timeit.repeat(function, number=number, repeat=args.repeat)) / number * 1000
+
+    if auto_tile.np is not None:
+        array = auto_tile.np.asarray(classes, dtype=auto_tile.np.uint8)
+        print(f"{'auto_tile_array':<22} {best(lambda: auto_tile.auto_tile_array(array)):>10.3f} ms")
+        print(f"{'compile_grid array':<22} {best(lambda: compile_grid((1, 1), (0, 0), array)):>10.3f} ms")
+    # most of it is converting the nested lists
+    print(f"{'compile_grid lists':<22} {best(lambda: compile_grid((1, 1), (0, 0), classes)):>10.3f} ms")
+    np_ = auto_tile.np
+    auto_tile.np = None
+    print(f"{'auto_tile per cell':<22} {best(lambda: auto_tile.auto_tile(classes), 1):>10.3f} ms")
+    auto_tile.np = np_
+
+    tiler = auto_tile.AutoTiler(classes)
+    cells = [(rng.randrange(args.size), rng.randrange(args.size), rng.choice((EMPTY, WALL))) for _ in range(1000)]
+
+    def updates():
+        for x, y, tile_class in cells:
+            tiler.set(x, y, tile_class)
+
+    print(f"{'AutoTiler.set':<22} {best(updates) / len(cells) * 1000:>10.3f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Compares per body pygame.Rect collision lists and TileGrid lookups against BatchCollider, run from the project
+directory:\n
+python -m benchmarks.collisions
+
+Level.collide_bodies picks between the grid lookups and the batch, the body count from which the batch stays faster is
+what settings.BATCH_COLLISION_MIN_BODIES should be.
+"""
+import argparse
+import random
+import timeit
+from typing import List
+
+import pygame as p
+
+from asserts.sourse.collisions import BatchCollider, TileGrid, WALL, SPIKE, WIN, np
+
+
+def random_map(width: int, height: int, rng: random.Random) -> List[List[int]]:
+    return [[rng.choice((0, 0, 0, 1, 10, 21)) for _ in range(height)] for _ in range(width)]
+
+
+def rect_path(statics: List[List[p.Rect]], bodies: List[p.Rect]):
+    # what Player did before: one collidelistall per body per tile class
+    return [[bool(body.collidelistall(boxes)) for body in bodies] for boxes in statics]
+
+
+def grid_path(grid: TileGrid, bodies: List[p.Rect]):
+    # what Level.collide_bodies does below BATCH_COLLISION_MIN_BODIES
+    return [[grid.collide(body, mask) for body in bodies] for mask in (WALL, SPIKE, WIN)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="collision backend benchmark")
+    parser.add_argument("-s", "--size", type=int, default=15, help="map width and height in tiles, 15 is about a level")
+    parser.add_argument("-n", "--number", type=int, default=20, help="calls per run")
+    parser.add_argument("-r", "--repeat", type=int, default=7, help="runs per case, the best one counts")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    grid = TileGrid.from_map(random_map(args.size, args.size, rng))
+    collider = BatchCollider.from_grid(grid)
+    statics = [grid.hit_boxes(mask) for mask in (WALL, SPIKE, WIN)]
+    extent = args.size * grid.tile_size
+    print(f"{len(collider)} static boxes, numpy: {np is not None}")
+
+    def best(function) -> float:
+        function()
+        return min(timeit.repeat(function, number=args.number, repeat=args.repeat)) / args.number * 1000
+
+    print(f"{'bodies':>8} {'rect ms':>10} {'grid ms':>10} {'batch ms':>10} {'vs grid':>8}")
+    crossover = None
+    for count in (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000):
+        bodies = [p.Rect(rng.randrange(extent), rng.randrange(extent), 32, 32) for _ in range(count)]
+        rect_t = best(lambda: rect_path(statics, bodies))
+        grid_t = best(lambda: grid_path(grid, bodies))
+        batch_t = best(lambda: collider.collide_classes(bodies))
+        # the smallest count from which the batch is faster at every bigger count too
+        if batch_t >= grid_t:
+            crossover = None
+        elif crossover is None:
+            crossover = count
+        print(f"{count:>8} {rect_t:>10.3f} {grid_t:>10.3f} {batch_t:>10.3f} {grid_t / batch_t:>8.2f}")
+    print(f"batch is faster than the grid from {crossover} bodies" if crossover else "batch was never faster")
+
+
+if __name__ == '__main__':
+    main()
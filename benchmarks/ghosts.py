@@ -0,0 +1,89 @@
+"""
+Times one tick (loop and draw) of 10, 100 and 1000 ghosts, per object KilledPlayer replay against GhostManager, run
+from the project directory:\n
+python -m benchmarks.ghosts
+"""
+import argparse
+import os
+import random
+import timeit
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame as p
+from pygame.math import Vector2
+
+from asserts.sourse.ghosts import GhostManager, np
+from asserts.sourse.history import MoveHistory
+
+
+class ObjectGhost:
+    # the per object replay Level.memories used before GhostManager
+    def __init__(self, history: MoveHistory, end_pos: Vector2):
+        self.time = 0
+        self.cache = list(history)
+        self.pos = self.cache[0]
+        self.end_pos = end_pos
+        self.go = True
+
+    def loop(self):
+        self.time += 1
+        if self.go:
+            if self.pos == self.end_pos or self.time >= len(self.cache):
+                self.go = False
+            else:
+                self.pos = self.cache[self.time]
+
+    def draw(self, screen: p.Surface, image: p.Surface):
+        screen.blit(image, (self.pos[1] * 32, self.pos[0] * 32))
+
+
+def random_history(rng: random.Random, steps: int) -> MoveHistory:
+    history = MoveHistory(delta=True)
+    x, y = 4, 2
+    for _ in range(steps):
+        history.append((x, y))
+        x = min(max(x + rng.choice((-1, 0, 1)), 0), 14)
+        y = min(max(y + rng.choice((-1, 0, 1)), 0), 5)
+    return history
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ghost replay stress benchmark")
+    parser.add_argument("-s", "--steps", type=int, default=500, help="recorded steps per ghost")
+    parser.add_argument("-r", "--repeat", type=int, default=50, help="ticks per measurement")
+    args = parser.parse_args()
+
+    p.display.init()
+    screen = p.display.set_mode((480, 190))
+    image = p.Surface((32, 32), p.SRCALPHA)
+    image.fill((255, 0, 0, 120))
+    rng = random.Random(0)
+    print(f"numpy: {np is not None}")
+    print(f"{'ghosts':>8} {'objects ms':>11} {'manager ms':>11} {'speedup':>8}")
+    for count in (10, 100, 1000):
+        histories = [random_history(rng, args.steps) for _ in range(count)]
+        ends = [Vector2(-1, -1)] * count
+        objects = [ObjectGhost(h, e) for h, e in zip(histories, ends)]
+        manager = GhostManager()
+        for h, e in zip(histories, ends):
+            manager.add(h, e)
+
+        def objects_tick():
+            for ghost in objects:
+                ghost.loop()
+            for ghost in objects:
+                ghost.draw(screen, image)
+
+        def manager_tick():
+            manager.loop()
+            manager.draw(screen, image)
+
+        objects_t = timeit.timeit(objects_tick, number=args.repeat) / args.repeat * 1000
+        manager_t = timeit.timeit(manager_tick, number=args.repeat) / args.repeat * 1000
+        print(f"{count:>8} {objects_t:>11.3f} {manager_t:>11.3f} {objects_t / manager_t:>8.2f}")
+    p.quit()
+
+
+if __name__ == '__main__':
+    main()
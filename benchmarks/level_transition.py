@@ -0,0 +1,60 @@
+"""
+Times the frame where the player reaches the win tile, building the next level in place against taking it from the
+prefetcher or the level cache, run from the project directory:\n
+python -m benchmarks.level_transition
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame as p
+
+import asserts.graphics.graphics_manager as graphics
+import asserts.sourse.app as app
+import asserts.sourse.settings as settings
+
+
+def transition(game: app.App, mode: str) -> float:
+    game.level = app.Level(1, game)
+    graphics.surface_cache.clear()
+    game.level_cache.clear()
+    if mode == "prefetched":
+        game.prefetcher.prefetch(2)
+        game.prefetcher.wait()
+    elif mode == "cached":
+        # played before, its chunks are rendered
+        game.level_cache.get(2).prepare()
+        game.prefetcher.wait()
+    start = time.perf_counter()
+    if mode == "synchronous":
+        game.level = app.Level(2, game)
+    elif mode == "prefetched":
+        game.level = game.prefetcher.take(2)
+    else:
+        game.level = game.level_cache.get(2)
+    game.player.respawn()
+    game.draw()
+    elapsed = time.perf_counter() - start
+    game.prefetcher.wait()
+    return elapsed * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="level transition benchmark")
+    parser.add_argument("-r", "--repeat", type=int, default=20, help="transitions per measurement")
+    args = parser.parse_args()
+
+    p.init()
+    game = app.App(height=settings.HEIGHT, width=settings.WIDTH, bg_color=settings.BG_COLOR, play_sound=False)
+    game.prefetcher.wait()
+    for name in ("synchronous", "prefetched", "cached"):
+        times = sorted(transition(game, name) for _ in range(args.repeat))
+        print(f"{name:>12}: median {times[len(times) // 2]:.3f} ms, worst {times[-1]:.3f} ms")
+    p.quit()
+
+
+if __name__ == '__main__':
+    main()
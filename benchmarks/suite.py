@@ -0,0 +1,169 @@
+"""
+Benchmark suite of the hot paths, run headless under the SDL dummy driver from the project directory:\n
+python -m benchmarks.suite             compare against benchmarks/baseline.json, exit code 1 on regression\n
+python -m benchmarks.suite --update    store the current results as the new baseline
+
+Every case reports the median per call time in microseconds of at least MIN_REPEAT runs of at least MIN_RUN_SECONDS
+each, single short runs are too noisy to gate on. Every run alternates with a run of a fixed pure python workload
+(reference), the gate compares the median case / reference ratio against the baseline, so the speed of the machine at
+the time, which easily drifts by a third between runs, cancels out. Baselines still come from one machine, record the
+committed one again with --update before measuring a change elsewhere.
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import statistics
+import sys
+import time
+import timeit
+from typing import Callable, Dict, Optional, Tuple
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame as p
+
+import asserts.maps.maps_manager as maps
+import asserts.sourse.app as app
+import asserts.sourse.settings as settings
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+MIN_REPEAT = 5
+MIN_RUN_SECONDS = 0.1
+
+caseT = Callable[[], object]
+resultT = Dict[str, float]
+
+
+def reference():
+    values = [(i * 7919) % 1009 for i in range(300)]
+    values.sort()
+    return {v: str(v) for v in values}
+
+
+def cases(game: app.App) -> Dict[str, Tuple[caseT, int, Optional[caseT]]]:
+    """
+    :return: name: (function, calls per run, untimed setup before every call or None)
+    """
+    level = game.level
+    return {
+        "maps.load_level": (lambda: maps.load_level(1), 200, None),
+        "Level.__init__": (lambda: app.Level(1, game), 100, None),
+        "Player.get_debug": (game.player.get_debug, 5000, None),
+        "Level.draw": (level.draw, 1000, None),
+        "BaseApp.handle_input": (game.handle_input, 5000, None),
+        # the first tick of the level every time, not a player that fell out of the map many calls ago
+        "App.loop": (lambda: game.loop(1 / game.max_tps), 500, game.restart_level),
+    }
+
+
+def _timed(function: caseT, setup: Optional[caseT]) -> Callable[[int], float]:
+    def timed(calls: int) -> float:
+        if setup is None:
+            return timeit.timeit(function, number=calls)
+        total = 0.0
+        for _ in range(calls):
+            setup()
+            start = time.perf_counter()
+            function()
+            total += time.perf_counter() - start
+        return total
+
+    return timed
+
+
+def _calls(timed: Callable[[int], float], number: int) -> int:
+    # warms up and sizes the runs, short runs are mostly timer and scheduler noise
+    first = timed(number)
+    if first < MIN_RUN_SECONDS:
+        number = math.ceil(number * MIN_RUN_SECONDS / max(first, 1e-6))
+    return number
+
+
+def measure(function: caseT, number: int, repeat: int, setup: Optional[caseT] = None) -> resultT:
+    """
+    Runs of the case alternate with runs of reference.\n
+    :param number: calls per run, raised until a run takes MIN_RUN_SECONDS
+    :return: {"us": median per call time in microseconds, "relative": median of case / reference per run pair}
+    """
+    case = _timed(function, setup)
+    ref = _timed(reference, None)
+    # game code may print debug output every tick, it is part of the cost but not of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        number = _calls(case, number)
+        ref_number = _calls(ref, 100)
+        runs = []
+        ratios = []
+        for _ in range(repeat):
+            ref_time = ref(ref_number) / ref_number
+            case_time = case(number) / number
+            runs.append(case_time)
+            ratios.append(case_time / ref_time)
+    return {"us": statistics.median(runs) * 1e6, "relative": statistics.median(ratios)}
+
+
+def run(repeat: int) -> Dict[str, resultT]:
+    p.init()
+    game = app.App(height=settings.HEIGHT, width=settings.WIDTH, bg_color=settings.BG_COLOR, play_sound=False)
+    game.prefetcher.wait()
+    results = {name: measure(function, number, repeat, setup)
+               for name, (function, number, setup) in cases(game).items()}
+    game.prefetcher.wait()
+    p.quit()
+    return results
+
+
+def compare(results: Dict[str, resultT], baseline: Dict[str, resultT], threshold: float) -> bool:
+    """
+    :return: no case got slower relative to the reference than threshold
+    """
+    ok = True
+    print(f"{'case':<22} {'baseline us':>12} {'now us':>10} {'change':>8}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<22} {'-':>12} {result['us']:>10.2f} {'new':>8}")
+            continue
+        change = result["relative"] / base["relative"] - 1
+        regressed = change > threshold
+        ok = ok and not regressed
+        print(f"{name:<22} {base['us']:>12.2f} {result['us']:>10.2f} {change:>+8.1%}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="performance benchmark suite")
+    parser.add_argument("-t", "--threshold", type=float, default=0.25,
+                        help="allowed slowdown against the baseline, 0.25 is 25%%")
+    parser.add_argument("-r", "--repeat", type=int, default=7,
+                        help=f"runs per case, the median counts, at least {MIN_REPEAT}")
+    parser.add_argument("-b", "--baseline", default=BASELINE, help="baseline json file")
+    parser.add_argument("-u", "--update", action="store_true", help="write results as the new baseline")
+    args = parser.parse_args()
+    if args.repeat < MIN_REPEAT:
+        parser.error(f"--repeat must be at least {MIN_REPEAT}")
+    if not args.update and not os.path.exists(args.baseline):
+        parser.error(f"no baseline at {args.baseline}, record one with --update")
+
+    results = run(args.repeat)
+    if args.update:
+        with open(args.baseline, "w") as file:
+            json.dump({name: {k: round(v, 4) for k, v in result.items()} for name, result in results.items()}, file,
+                      indent=4)
+            file.write("\n")
+        print(f"baseline written to {args.baseline}")
+        compare(results, results, args.threshold)
+        return
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    if not compare(results, baseline, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
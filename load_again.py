@@ -1,13 +1,26 @@
 import argparse
 
-from main import main
+from main import main, headless, replay, startup_profile
 
 parser = argparse.ArgumentParser()
 group = parser.add_mutually_exclusive_group()
 group.add_argument("-v", "--verbose", action="store_true", help='tell mode')
 group.add_argument("-q", "--quiet", action="store_true", help='quiet mode')
+parser.add_argument("--headless", type=int, metavar="TICKS", help="simulate TICKS ticks without display and sound")
+parser.add_argument("--timings", metavar="FILE", help="export frame phase timings to FILE (.csv or .json) on exit")
+parser.add_argument("--record", metavar="FILE", help="record the session input to FILE")
+parser.add_argument("--replay", metavar="FILE", help="replay a recorded session without display as fast as possible")
+parser.add_argument("--no-verify", action="store_true", help="do not compare the replayed state with the recording")
+parser.add_argument("--startup-profile", action="store_true", help="report the time to the first frame by phase")
 args = parser.parse_args()
 
 # tell = args.verbose or __debug__
 # main(v=tell)
-main()
+if args.startup_profile:
+    startup_profile()
+elif args.replay:
+    replay(args.replay, not args.no_verify)
+elif args.headless is not None:
+    headless(args.headless)
+else:
+    main(args.timings, args.record)
@@ -1,12 +1,87 @@
+# keep first, the startup profile counts the imports after it
+from asserts.sourse.started import STARTED
+import time
+from typing import Optional
+
 import pygame as p
 
 import asserts.sourse.app as app
 import asserts.sourse.settings as settings
+from asserts.sourse.profiler import FrameTimer
+from asserts.sourse.replay import Recording, replay as run_replay
+
+IMPORTED = time.perf_counter()
 
 
-def main():
+def main(timings: Optional[str] = None, record: Optional[str] = None):
+    """
+    :param timings: file the frame phase timings are exported to on exit, .csv or .json
+    :param record: file the session input is recorded to
+    """
     p.init()
-    app.App(height=settings.HEIGHT, width=settings.WIDTH, bg_color=settings.BG_COLOR).run()
+    game = app.App(height=settings.HEIGHT, width=settings.WIDTH, bg_color=settings.BG_COLOR,
+                   dirty_rects=settings.DIRTY_RECTS, records_path=settings.RECORDS_PATH)
+    if record:
+        game.start_recording(record)
+    try:
+        game.run()
+    finally:
+        game.stop_recording()
+        game.records.close()
+    if timings:
+        game.timer.export(timings)
+    p.quit()
+
+
+def headless(ticks: int):
+    """
+    Runs the game simulation without display and sound as fast as possible.
+    """
+    p.font.init()
+    game = app.App(height=settings.HEIGHT, width=settings.WIDTH, headless=True)
+    start = time.perf_counter()
+    done = game.simulate(ticks)
+    elapsed = time.perf_counter() - start
+    print(f"{done} ticks in {elapsed:.3f} s, {done / elapsed if elapsed else float('inf'):.0f} ticks/s")
+    p.quit()
+
+
+def replay(path: str, verify: bool = True):
+    """
+    Replays a recorded session without display and sound as fast as possible.
+    """
+    p.font.init()
+    game = app.App(height=settings.HEIGHT, width=settings.WIDTH, headless=True)
+    recording = Recording.load(path)
+    start = time.perf_counter()
+    done = run_replay(game, recording, verify)
+    elapsed = time.perf_counter() - start
+    print(f"{done} ticks in {elapsed:.3f} s, {done / elapsed if elapsed else float('inf'):.0f} ticks/s"
+          + (", state matches the recording" if verify and recording.checksum_every else ""))
+    p.quit()
+
+
+def startup_profile():
+    """
+    Starts the game up to its first drawn frame and prints how long every phase took.
+    """
+    timer = FrameTimer(1)
+    timer.add("imports", (IMPORTED - STARTED) * 1000)
+    with timer.phase("pygame init"):
+        p.init()
+    game = app.App(height=settings.HEIGHT, width=settings.WIDTH, bg_color=settings.BG_COLOR,
+                   dirty_rects=settings.DIRTY_RECTS)
+    for name, samples in game.startup_timer.samples.items():
+        timer.add(f"App: {name}", samples[-1])
+    with timer.phase("first frame"):
+        game.check_events()
+        game.render()
+    total = 0.0
+    for name, samples in timer.samples.items():
+        total += samples[-1]
+        print(f"{name:<22} {samples[-1]:>8.2f} ms")
+    print(f"{'time to first frame':<22} {total:>8.2f} ms")
+    game.prefetcher.wait()
     p.quit()
 
 